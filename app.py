@@ -7,13 +7,19 @@
 # app.py
 
 import streamlit as st
-import pandas as pd
-from session_loader import load_newest_3_sessions, load_oldest_7_sessions
+import numpy as np
+from session_loader import load_newest_3_sessions, load_oldest_7_sessions, load_shot_index
 from shot_selection import selected_shots_idx
 from plot_utils import plot_top_view, plot_side_view
+from replay import plot_top_replay, plot_side_replay
 from export_utils import export_section
+from shot_flags import valid_shots
+from derived import derived, summary_table, history_zones
 from notes import show_notes
 from auth_ui import auth_ui
+from live import live_dashboard
+from session_cache import SESSION_CACHE
+from make_model import user_make_model
 
 # -----------------------------
 # Streamlit config
@@ -35,16 +41,35 @@ if not username:
     st.warning("Please log in or enable dev mode to load session data.")
     st.stop()
 
-# Load sessions
-newest_sessions = load_newest_3_sessions(username)
+# -----------------------------
+# Live mode: follow the detection system instead of stored sessions
+# -----------------------------
+if st.toggle("Live Session", help="Show shots from the detection system as they land."):
+    live_dashboard()
+    show_notes()
+    st.stop()
+
+# Load sessions (shared read-only objects; the tab's lease keeps them cached while shown)
+if "session_lease" not in st.session_state:
+    st.session_state.session_lease = SESSION_CACHE.lease()
+newest_sessions = load_newest_3_sessions(username, st.session_state.session_lease)
 oldest_sessions = load_oldest_7_sessions(username)
+shot_index = load_shot_index(username, newest_sessions)
+if st.session_state.dev_mode_enabled:
+    with st.sidebar.expander("Session cache"):
+        st.write(SESSION_CACHE.stats())
+if not newest_sessions and not oldest_sessions:
+    st.info("No sessions recorded yet.")
+    st.stop()
 
 # -----------------------------
 # Session selection dropdown
 # -----------------------------
 session_options = [
     f"Session {s['session_number']} ({s['datetime']})" for s in newest_sessions
-] + ["Oldest Sessions 4-10"]
+]
+if oldest_sessions:
+    session_options.append("Oldest Sessions 4-10")
 
 selected_session_idx = st.selectbox(
     "Select a session to view",
@@ -55,32 +80,26 @@ selected_session_idx = st.selectbox(
 # -----------------------------
 # Load session data based on selection
 # -----------------------------
-if selected_session_idx < 3:
+if selected_session_idx < len(newest_sessions):
     # Individual newest session
     selected_session = newest_sessions[selected_session_idx]
-    df = pd.DataFrame(selected_session["df"])
+    flags = selected_session["flags"]
     shots = selected_session["shots"]
-    component_avg = {col: df[col].mean() for col in ["Backboard", "Rim", "Net"]}
-    game_make_avg = df["Game Make"].mean()
+    # Tables and averages are computed once per session version (see derived.py)
+    df = derived(selected_session, "results_table").copy()
+    component_avg, game_make_avg = derived(selected_session, "averages")
+    # Predicted make probability per shot from its trajectory (see make_model.py)
+    make_model = user_make_model(username, newest_sessions)
+    make_prob = (make_model.predict(derived(selected_session, "features")) if make_model
+                 else np.full(len(flags), np.nan))
+    df["Predicted Make %"] = (make_prob * 100).round(1)
     show_individual = True
 else:
     # Oldest 4–10 sessions summary
-    df = pd.DataFrame([{
-        "Session Number": s["session_number"],
-        "DateTime": s["datetime"],
-        "Backboard Avg": s["Component_Averages"]["Backboard"],
-        "Rim Avg": s["Component_Averages"]["Rim"],
-        "Net Avg": s["Component_Averages"]["Net"],
-        "Game Make Avg": s["Game_Make_Avg"],
-        "Total Shots": s["Total_Shots"],
-        "Makes": s["Makes"],
-        "Misses": s["Misses"]
-    } for s in oldest_sessions])
-    
-    # Sort table newest → oldest
-    df = df.sort_values("DateTime", ascending=False).reset_index(drop=True)
-    
+    df = summary_table(username, oldest_sessions)
+
     shots = []
+    flags = None
     component_avg = {
         "Backboard": df["Backboard Avg"].mean(),
         "Rim": df["Rim Avg"].mean(),
@@ -104,29 +123,54 @@ if show_individual:
     st.markdown("**Technical Component Averages:**")
     st.write(component_avg)
     st.write(f"**Overall Game Make Rate:** {game_make_avg:.2f}")
+    flagged = len(flags) - len(valid_shots(flags))
+    if flagged:
+        st.warning(f"{flagged} of {len(flags)} shots failed the data checks and are left out of "
+                   "the averages and zone splits (see the Data Check column).")
+    if not np.isnan(make_prob).all():
+        st.write(f"**Expected Make Rate (shot quality):** {np.nanmean(make_prob):.2f}")
 else:
     st.info("Showing summary of oldest sessions. Individual shot selection, plots, and averages are not available.")
 
+# Zone splits come from the per-zone counts stored with each session
+st.markdown("**Shooting by Zone:**")
+if show_individual:
+    zone_df = derived(selected_session, "zone_splits")
+else:
+    zone_df = history_zones(username, oldest_sessions)
+if zone_df is not None:
+    st.dataframe(zone_df, hide_index=True)
+else:
+    st.info("Zone splits are not available for these sessions.")
+
 # -----------------------------
 # Section 2 & 3: Shot Selection and Plots
 # -----------------------------
 if show_individual:
     st.header("Select Shot(s) to Display")
-    selected_idx = selected_shots_idx(shots)
+    selected_idx = selected_shots_idx(shots, flags, shot_index, selected_session["session_number"])
+
+    replay = st.toggle("Replay selected shots", help="Animate the selected shots flying toward the rim.")
 
     col1, col2 = st.columns(2)
     with col1:
         safe_selected_idx = [i for i in selected_idx if isinstance(i, int) and 0 <= i < len(shots)]
-        plot_top_view(shots, safe_selected_idx)
+        if replay:
+            plot_top_replay(selected_session, safe_selected_idx)
+        else:
+            plot_top_view(shots, safe_selected_idx)
     with col2:
-        plot_side_view(shots, safe_selected_idx)
+        if replay:
+            plot_side_replay(selected_session, safe_selected_idx)
+        else:
+            plot_side_view(shots, safe_selected_idx)
 
 # -----------------------------
 # Section 4: Export
 # -----------------------------
 st.header("Export Data")
 if show_individual:
-    export_section(df, component_avg)
+    export_section(df, derived(selected_session, "export_tables"))
 else:
     st.info("Export not available for summary of oldest sessions.")
 
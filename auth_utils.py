@@ -3,36 +3,47 @@
 
 import json
 import os
+from storage import DATA_ROOT, user_path, user_lock, read_json, write_json, delete_user_data
 
-# Path for users.json in the same folder as auth_utils.py
-USERS_FILE = os.path.join(os.path.dirname(__file__), "users.json")
+# Accounts live in each user's shard directory (see storage.py).
+# users.json next to the code is the old flat store; it is imported once.
+LEGACY_USERS_FILE = os.path.join(os.path.dirname(__file__), "users.json")
+LEGACY_IMPORT_MARKER = os.path.join(DATA_ROOT, "legacy_users_imported")
 
-# Ensure users.json exists
-if not os.path.exists(USERS_FILE):
-    with open(USERS_FILE, "w") as f:
-        json.dump({}, f)
+# Function to load one account from its shard
+def load_account(username):
+    """Return the stored account for username, or None."""
+    if not username:
+        return None
+    return read_json(user_path(username, "account.json"))
 
-# Function to load users from the JSON file
-def load_users():
-    """Load users from the JSON file."""
-    with open(USERS_FILE, "r") as f:
+# Function to save one account to its shard
+def save_account(username, password):
+    """Write the account for username."""
+    write_json(user_path(username, "account.json"), {"username": username, "password": password})
+
+# Import accounts from the legacy users.json
+def import_legacy_users():
+    """Copy users from the old users.json into per-user shards (runs once)."""
+    if os.path.exists(LEGACY_IMPORT_MARKER) or not os.path.exists(LEGACY_USERS_FILE):
+        return
+    with open(LEGACY_USERS_FILE, "r") as f:
         try:
             users = json.load(f)
         except json.JSONDecodeError:
             users = {}
-    return users
+    for username, password in users.items():
+        if load_account(username) is None:
+            save_account(username, password)
+    write_json(LEGACY_IMPORT_MARKER, {"imported": len(users)})
 
-# Function to save users to the JSON file
-def save_users(users):
-    """Save users dictionary to the JSON file."""
-    with open(USERS_FILE, "w") as f:
-        json.dump(users, f, indent=4)
+import_legacy_users()
 
 # Authentication functions
 def login(username, password):
     """Return True if username/password match."""
-    users = load_users()
-    return username in users and users[username] == password
+    account = load_account(username)
+    return account is not None and account["password"] == password
 
 # Registration function
 def register(username, password):
@@ -41,29 +52,24 @@ def register(username, password):
     Returns True if registration successful.
     Returns False if username already exists.
     """
-    users = load_users()
-    if username in users:
-        return False
-    users[username] = password
-    save_users(users)
+    with user_lock(username):
+        if load_account(username) is not None:
+            return False
+        save_account(username, password)
     return True
 
 # Delete user function
 def delete_user(username):
-    """Delete a user from users.json"""
-    users = load_users()
-    if username in users:
-        del users[username]
-        save_users(users)
+    """Delete a user's account and stored sessions."""
+    if load_account(username) is not None:
+        delete_user_data(username)
         return True
     return False
 
 # Change password function
 def change_password(username, new_password):
     """Change password for a user."""
-    users = load_users()
-    if username in users:
-        users[username] = new_password
-        save_users(users)
+    if load_account(username) is not None:
+        save_account(username, new_password)
         return True
-    return False
\ No newline at end of file
+    return False
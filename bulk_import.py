@@ -0,0 +1,288 @@
+# Bulk import of historical detection-system logs into a user's session store
+# bulk_import.py
+#
+# Usage: python bulk_import.py USERNAME LOG [LOG ...] [--gap-minutes 30] [--chunk-size 20000]
+#
+# Logs hold shots in the data.py format (shot_id, backboard, rim, net, make,
+# trajectory {x, y, z}) plus a timestamp (ISO string or epoch seconds):
+#   .json   {"shots": [...]} or a top-level list of shots
+#   .jsonl  one shot per line
+#   .csv    shot_id, timestamp, backboard, rim, net, make and either a
+#           `trajectory` JSON column or trajectory_x/trajectory_y/trajectory_z JSON lists
+
+import argparse
+import csv
+import hashlib
+import itertools
+import json
+import os
+import time
+from datetime import datetime, timezone
+import numpy as np
+from data import find_shot_list
+from session_format import append_file
+from storage import load_manifest, save_sessions, user_path, user_lock
+
+CHUNK_SIZE = 20_000       # shots parsed and deduplicated at a time
+SESSION_GAP_MINUTES = 30  # a longer pause between shots starts a new session
+SESSION_BATCH = 50        # sessions written per store transaction
+SEEN_IDS_FILE = "shot_ids.bin"  # per user: keys of every imported shot_id, int64, append-only
+READ_BLOCK = 1 << 20      # bytes read at a time from JSON logs
+
+# -----------------------------
+# Streaming readers (bounded memory)
+# -----------------------------
+def _iter_json_shots(path):
+    """Yield shots from a JSON list (top level or under "shots") without loading the file."""
+    decoder = json.JSONDecoder()
+    with open(path, "r") as f:
+        buf = f.read(READ_BLOCK)
+        # Skip to the opening bracket of the shot list
+        pos = find_shot_list(buf)
+        while pos is None:
+            more = f.read(READ_BLOCK)
+            if not more:
+                return
+            buf += more
+            pos = find_shot_list(buf)
+        while True:
+            # Skip separators; refill when the buffer runs dry
+            while True:
+                while pos < len(buf) and buf[pos] in " \t\r\n,":
+                    pos += 1
+                if pos < len(buf):
+                    break
+                buf, pos = f.read(READ_BLOCK), 0
+                if not buf:
+                    return
+            if buf[pos] == "]":
+                return
+            try:
+                shot, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                more = f.read(READ_BLOCK)
+                if not more:
+                    raise
+                buf, pos = buf[pos:] + more, 0
+                continue
+            yield shot
+            pos = end
+
+def _iter_jsonl_shots(path):
+    with open(path, "r") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def _iter_csv_shots(path):
+    with open(path, "r", newline="") as f:
+        for row in csv.DictReader(f):
+            if row.get("trajectory"):
+                trajectory = json.loads(row["trajectory"])
+            else:
+                trajectory = {axis: json.loads(row[f"trajectory_{axis}"]) for axis in "xyz"}
+            shot = {"shot_id": row["shot_id"], "timestamp": row.get("timestamp"), "trajectory": trajectory}
+            for key in ("backboard", "rim", "net", "make"):
+                if row.get(key) not in (None, ""):
+                    shot[key] = row[key].strip().lower() in ("1", "true", "yes")
+            yield shot
+
+def iter_log_shots(path):
+    """Shots from one log file, streamed."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".jsonl":
+        return _iter_jsonl_shots(path)
+    if ext == ".csv":
+        return _iter_csv_shots(path)
+    return _iter_json_shots(path)
+
+def iter_chunks(shots, size=CHUNK_SIZE):
+    shots = iter(shots)
+    while chunk := list(itertools.islice(shots, size)):
+        yield chunk
+
+# -----------------------------
+# Deduplication
+# -----------------------------
+def _id_key(shot_id):
+    """64-bit key for a shot_id (integers map to themselves)."""
+    if isinstance(shot_id, int) or (isinstance(shot_id, str) and shot_id.lstrip("-").isdigit()):
+        return int(shot_id)
+    digest = hashlib.blake2b(str(shot_id).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True)
+
+class SeenIds:
+    """
+    Exact set of shot ids as sorted int64 runs: ~8 bytes per id instead of
+    ~70 for a Python set, so tens of millions of ids fit on a laptop.
+    Persisted per user as an append-only file, so re-importing a log (or
+    one that overlaps an earlier import) skips the shots already stored.
+    """
+
+    MAX_RUNS = 8
+
+    def __init__(self):
+        self._runs = []
+
+    @classmethod
+    def load(cls, path):
+        seen = cls()
+        try:
+            keys = np.fromfile(path, dtype="<i8")
+        except FileNotFoundError:
+            return seen
+        if len(keys):
+            seen._runs = [np.unique(keys)]
+        return seen
+
+    @staticmethod
+    def append(path, keys):
+        """Persist keys of stored shots. Callers write each batch once its sessions are saved."""
+        append_file(path, np.asarray(keys, dtype="<i8").tobytes(), record_size=8)
+
+    def __len__(self):
+        return sum(len(r) for r in self._runs)
+
+    def _contains(self, keys):
+        found = np.zeros(len(keys), dtype=bool)
+        for run in self._runs:
+            pos = np.minimum(np.searchsorted(run, keys), len(run) - 1)
+            found |= run[pos] == keys
+        return found
+
+    def add_new(self, keys):
+        """Record keys; returns a mask of those not seen before (first occurrence only)."""
+        keys = np.asarray(keys, dtype=np.int64)
+        _, first = np.unique(keys, return_index=True)
+        new = np.zeros(len(keys), dtype=bool)
+        new[first] = True
+        new &= ~self._contains(keys)
+        if new.any():
+            self._runs.append(np.sort(keys[new]))
+        if len(self._runs) > self.MAX_RUNS:
+            # Merge runs, log-structured, so lookups stay a handful of binary searches
+            self._runs = [np.sort(np.concatenate(self._runs))]
+        return new
+
+# -----------------------------
+# Sessions
+# -----------------------------
+def _timestamp(value):
+    """Seconds since the epoch from an ISO string or number (None if missing)."""
+    if value in (None, ""):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except ValueError:
+        parsed = datetime.fromisoformat(value)
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.timestamp()
+
+def to_raw_session(session_number, shots, started):
+    """A raw session (as validated by session_format) from detection-system shots."""
+    return {
+        "session_number": session_number,
+        "datetime": datetime.fromtimestamp(started, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S"),
+        "df": [{
+            "Backboard": int(shot.get("backboard", True)),
+            "Rim": int(shot.get("rim", True)),
+            "Net": int(shot.get("net", True)),
+            "Game Make": int(shot.get("make", True)),
+        } for shot in shots],
+        "shots": [{
+            "result": "Make" if shot.get("make", True) else "Miss",
+            "trajectory": {axis: list(shot["trajectory"][axis]) for axis in "xyz"},
+        } for shot in shots],
+    }
+
+class Importer:
+    """Groups a time-ordered stream of shots into sessions and writes them in batches."""
+
+    def __init__(self, username, gap_minutes=SESSION_GAP_MINUTES, batch=SESSION_BATCH):
+        self.username = username
+        self.gap = gap_minutes * 60
+        self.batch = batch
+        manifest = load_manifest(username)
+        self.next_number = max((e["session_number"] for e in manifest["sessions"]), default=0) + 1
+        self.seen_path = user_path(username, SEEN_IDS_FILE)
+        self.seen = SeenIds.load(self.seen_path)
+        self.pending, self.pending_keys = [], []
+        self.current, self.current_keys, self.started, self.last = [], [], None, None
+        self.shots_read = self.duplicates = self.sessions_written = 0
+
+    def add_chunk(self, chunk):
+        self.shots_read += len(chunk)
+        keys = [_id_key(shot["shot_id"]) for shot in chunk]
+        new = self.seen.add_new(keys)
+        self.duplicates += int((~new).sum())
+        for shot, key, keep in zip(chunk, keys, new.tolist()):
+            if not keep:
+                continue
+            ts = _timestamp(shot.get("timestamp"))
+            if ts is None:
+                ts = self.last if self.last is not None else 0.0
+            if self.current and ts - self.last > self.gap:
+                self._close_session()
+                if len(self.pending) >= self.batch:
+                    self.flush()
+            if not self.current:
+                self.started = ts
+            self.current.append(shot)
+            self.current_keys.append(key)
+            self.last = ts
+
+    def _close_session(self):
+        self.pending.append(to_raw_session(self.next_number, self.current, self.started))
+        self.pending_keys.extend(self.current_keys)
+        self.next_number += 1
+        self.current, self.current_keys = [], []
+
+    def flush(self):
+        """Write pending sessions in one store transaction (which also indexes them)."""
+        if not self.pending:
+            return
+        save_sessions(self.username, self.pending)
+        # After the sessions: a crash in between re-imports this batch rather than losing it
+        with user_lock(self.username):
+            SeenIds.append(self.seen_path, self.pending_keys)
+        self.sessions_written += len(self.pending)
+        self.pending, self.pending_keys = [], []
+
+    def finish(self):
+        if self.current:
+            self._close_session()
+        self.flush()
+
+def import_logs(username, paths, gap_minutes=SESSION_GAP_MINUTES, chunk_size=CHUNK_SIZE, report=print):
+    """Import log files (each in time order) for a user. Returns the Importer with totals."""
+    importer = Importer(username, gap_minutes)
+    t0 = time.perf_counter()
+    for path in paths:
+        for chunk in iter_chunks(iter_log_shots(path), chunk_size):
+            importer.add_chunk(chunk)
+            elapsed = time.perf_counter() - t0
+            report(f"{path}: {importer.shots_read:,} shots read, {importer.duplicates:,} duplicates, "
+                   f"{importer.sessions_written:,} sessions written "
+                   f"({importer.shots_read / max(elapsed, 1e-9):,.0f} shots/sec)")
+    importer.finish()
+    elapsed = time.perf_counter() - t0
+    report(f"Done: {importer.shots_read - importer.duplicates:,} shots in "
+           f"{importer.sessions_written:,} sessions, {elapsed:.1f}s "
+           f"({importer.shots_read / max(elapsed, 1e-9):,.0f} shots/sec)")
+    return importer
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import detection-system logs into a user's sessions.")
+    parser.add_argument("username")
+    parser.add_argument("logs", nargs="+", help=".json, .jsonl or .csv files, oldest first")
+    parser.add_argument("--gap-minutes", type=float, default=SESSION_GAP_MINUTES,
+                        help="pause between shots that starts a new session")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="shots processed at a time")
+    args = parser.parse_args()
+    import_logs(args.username, args.logs, args.gap_minutes, args.chunk_size)
+
+if __name__ == "__main__":
+    main()
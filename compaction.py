@@ -0,0 +1,122 @@
+# Retention and compaction of raw trajectory data
+# compaction.py
+#
+# Usage: python compaction.py [USERNAME ...] [--max-age-days 90] [--max-hot-mb 50] [--keep-newest 3]
+#
+# Run periodically (e.g. from cron). With no usernames, every user under
+# DATA_ROOT is compacted. Trajectories of sessions past the policy move into
+# compressed archive chunks; flags, summaries and zone counts stay hot, and
+# storage.load_session re-hydrates archived trajectories on demand. The shot
+# index log is rewritten without rows of replaced session versions.
+
+import argparse
+import os
+from datetime import datetime, timedelta
+import numpy as np
+from storage import DATA_ROOT, SHOT_INDEX_FILE, user_path, user_lock, read_json, read_manifest, append_manifest_entries
+from shot_index import ShotIndex, RECORD
+from session_format import read_session_arrays, atomic_write, TRAJECTORY_ARRAYS
+
+MAX_AGE_DAYS = 90          # sessions older than this lose their hot trajectories
+MAX_HOT_MB = 50            # per-user budget for hot session files
+KEEP_NEWEST = 3            # never archive the sessions the dashboard opens by default
+ARCHIVE_CHUNK_SESSIONS = 64
+
+def _hot_size(username, entry):
+    try:
+        return os.path.getsize(user_path(username, entry["file"]))
+    except (OSError, TypeError):
+        return 0
+
+def select_for_archive(username, manifest, max_age_days=MAX_AGE_DAYS, max_hot_mb=MAX_HOT_MB,
+                       keep_newest=KEEP_NEWEST, now=None):
+    """Manifest entries whose trajectories should be archived under the policy."""
+    now = now or datetime.now()
+    cutoff = now - timedelta(days=max_age_days)
+    # Manifest is newest first; only sessions that still have hot trajectories are candidates
+    detail = [e for e in manifest["sessions"] if e.get("file")]
+    candidates = [e for e in detail[keep_newest:] if not e.get("archive")]
+
+    chosen = [e for e in candidates if datetime.fromisoformat(e["datetime"]) < cutoff]
+    chosen_numbers = {e["session_number"] for e in chosen}
+    hot = sum(_hot_size(username, e) for e in detail
+              if not e.get("archive") and e["session_number"] not in chosen_numbers)
+    # Over budget: archive oldest first until the hot set fits
+    for entry in reversed(candidates):
+        if hot <= max_hot_mb * 1024 * 1024:
+            break
+        if entry["session_number"] not in chosen_numbers:
+            chosen.append(entry)
+            chosen_numbers.add(entry["session_number"])
+            hot -= _hot_size(username, entry)
+    return chosen
+
+def _next_chunk(username):
+    archive_dir = user_path(username, "archive")
+    existing = [int(name[:-4]) for name in os.listdir(archive_dir)
+                if name.endswith(".npz") and name[:-4].isdigit()] if os.path.isdir(archive_dir) else []
+    return max(existing, default=0) + 1
+
+def compact_user(username, **policy):
+    """Archive trajectories for one user per the policy. Returns the number of sessions archived."""
+    with user_lock(username):
+        manifest = read_manifest(username)
+        if manifest is None:
+            return 0
+        chosen = select_for_archive(username, manifest, **policy)
+        chunk = _next_chunk(username)
+        for start in range(0, len(chosen), ARCHIVE_CHUNK_SESSIONS):
+            # Copies: the cached manifest must not change before the new entries are stored
+            batch = [dict(e) for e in chosen[start:start + ARCHIVE_CHUNK_SESSIONS]]
+            archive = os.path.join("archive", f"{chunk:05d}.npz")
+            archived, hot = {}, {}
+            for entry in batch:
+                arrays = read_session_arrays(user_path(username, entry["file"]))
+                names = [name for name in TRAJECTORY_ARRAYS if f"s0_{name}" in arrays]
+                for name in names:
+                    archived[f"n{entry['session_number']}_{name}"] = arrays.pop(f"s0_{name}")
+                hot[entry["session_number"]] = (arrays, names)
+
+            # Archive, then manifest, then hot files: a crash at any point leaves every
+            # session loadable (load_session reads an archived entry whose hot file
+            # still has its trajectories; an unreferenced archive chunk is harmless)
+            with atomic_write(user_path(username, archive)) as f:
+                np.savez_compressed(f, **archived)
+            for entry in batch:
+                entry["archive"], entry["archived_arrays"] = archive, hot[entry["session_number"]][1]
+            append_manifest_entries(username, batch)
+            for entry in batch:
+                with atomic_write(user_path(username, entry["file"])) as f:
+                    np.savez(f, **hot[entry["session_number"]][0])
+            chunk += 1
+
+        index_path = user_path(username, SHOT_INDEX_FILE)
+        index = ShotIndex.load(index_path)
+        if index.offset > len(index) * RECORD.itemsize:  # superseded or unlocated rows
+            index.save(index_path)
+    return len(chosen)
+
+def iter_usernames():
+    """Every user with a manifest under DATA_ROOT (a directory walk; batch jobs only)."""
+    users_root = os.path.join(DATA_ROOT, "users")
+    for dirpath, _, filenames in os.walk(users_root):
+        if "manifest.json" in filenames:
+            manifest = read_json(os.path.join(dirpath, "manifest.json"))
+            if manifest:
+                yield manifest["username"]
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive raw trajectories of old sessions.")
+    parser.add_argument("usernames", nargs="*", help="users to compact (default: all)")
+    parser.add_argument("--max-age-days", type=float, default=MAX_AGE_DAYS)
+    parser.add_argument("--max-hot-mb", type=float, default=MAX_HOT_MB)
+    parser.add_argument("--keep-newest", type=int, default=KEEP_NEWEST)
+    args = parser.parse_args()
+    policy = dict(max_age_days=args.max_age_days, max_hot_mb=args.max_hot_mb, keep_newest=args.keep_newest)
+    for username in args.usernames or iter_usernames():
+        archived = compact_user(username, **policy)
+        if archived:
+            print(f"{username}: archived trajectories of {archived} sessions")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# Court geometry shared by the top- and side-view plots, and court-zone classification
+# court_zones.py
+
+import math
+import numpy as np
+import pandas as pd
+from shot_flags import GAME_MAKE, ANOMALY_BITS
+
+# -----------------------------
+# Court geometry (feet, top view: rim at (RIM_X, RIM_Y), baseline at y=0)
+# -----------------------------
+COURT_WIDTH, COURT_LENGTH = 50, 47
+RIM_X, RIM_Y = 0, 5.25
+RIM_HEIGHT = 10
+RIM_SIDE_X = 39.5  # side view: where the rim center sits along the horizontal axis
+KEY_WIDTH, KEY_LENGTH = 12, 19
+RADIUS_3PT = 19.75
+CORNER_DISTANCE = 5.25  # corner 3 lines, measured from the sideline
+CORNER_X = COURT_WIDTH/2 - CORNER_DISTANCE
+CORNER_TOP_Y = RIM_Y + math.sqrt(max(RADIUS_3PT**2 - (CORNER_X - RIM_X)**2, 0))
+RESTRICTED_RADIUS = 4
+
+# -----------------------------
+# Zones
+# -----------------------------
+ZONES = [
+    "Restricted Area",
+    "Paint",
+    "Mid-Range Left",
+    "Mid-Range Center",
+    "Mid-Range Right",
+    "Left Corner 3",
+    "Right Corner 3",
+    "Above the Break 3",
+]
+UNKNOWN_ZONE = -1  # shot without a recorded location
+
+def classify_zones(x, y):
+    """Zone index (into ZONES) for every (x, y) court location, computed in one pass."""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    dx = x - RIM_X
+    dist = np.hypot(dx, y - RIM_Y)
+
+    # Beyond the arc above the corner lines, outside the corner lines below them
+    in_corner_band = y < CORNER_TOP_Y
+    three = np.where(in_corner_band, np.abs(dx) > CORNER_X, dist > RADIUS_3PT)
+    in_key = (np.abs(dx) <= KEY_WIDTH/2) & (y <= KEY_LENGTH)
+
+    return np.select(
+        [
+            three & in_corner_band & (dx < 0),
+            three & in_corner_band,
+            three,
+            dist <= RESTRICTED_RADIUS,
+            in_key,
+            dx < -KEY_WIDTH/2,
+            dx > KEY_WIDTH/2,
+        ],
+        [ZONES.index(z) for z in ("Left Corner 3", "Right Corner 3", "Above the Break 3",
+                                  "Restricted Area", "Paint", "Mid-Range Left", "Mid-Range Right")],
+        default=ZONES.index("Mid-Range Center"),
+    ).astype(np.int8)
+
+def release_points(points, offsets):
+    """
+    First point of every trajectory in a packed (2, P) array with per-shot offsets.
+    Shots with no points get NaN.
+    """
+    starts = np.asarray(offsets[:-1])
+    empty = starts >= np.asarray(offsets[1:])
+    idx = np.where(empty, 0, starts)
+    xy = points[:, idx] if points.shape[1] else np.zeros((2, len(starts)))
+    return np.where(empty, np.nan, xy[0]), np.where(empty, np.nan, xy[1])
+
+def shot_zones(points, offsets):
+    """Zone index per shot from the packed top-view trajectories (release point)."""
+    x, y = release_points(points, offsets)
+    zones = classify_zones(x, y)
+    zones[np.isnan(x)] = UNKNOWN_ZONE
+    return zones
+
+def zone_counts(zones, flags):
+    """Attempts and Game Make counts per zone (valid shots only), as int arrays aligned with ZONES."""
+    zones = np.asarray(zones)
+    known = (zones >= 0) & ((np.asarray(flags, dtype=np.uint8) & np.uint8(ANOMALY_BITS)) == 0)
+    attempts = np.bincount(zones[known], minlength=len(ZONES))
+    makes = np.bincount(zones[known], weights=(np.asarray(flags)[known] & GAME_MAKE) != 0,
+                        minlength=len(ZONES)).astype(np.int64)
+    return attempts, makes
+
+def zone_splits(attempts, makes):
+    """Per-zone shooting table."""
+    attempts = np.asarray(attempts)
+    makes = np.asarray(makes)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        pct = np.where(attempts > 0, makes / attempts * 100, np.nan)
+    return pd.DataFrame({"Zone": ZONES, "Attempts": attempts, "Makes": makes, "Make %": pct})
+
+def history_zone_splits(sessions):
+    """
+    Zone splits summed over many sessions from their stored per-zone counts.
+    Sessions without stored counts (legacy summaries) are skipped.
+    """
+    counted = [s for s in sessions if "Zone_Attempts" in s]
+    if not counted:
+        return None
+    attempts = np.sum([s["Zone_Attempts"] for s in counted], axis=0)
+    makes = np.sum([s["Zone_Makes"] for s in counted], axis=0)
+    return zone_splits(attempts, makes)
@@ -3,9 +3,11 @@ import json
 from pathlib import Path
 from typing import Optional, List, Dict
 
-def load_real_shot_data() -> Optional[Dict]:
+# Where the HoopIQ detection system writes its output
+SHOT_DATA_FILE = Path('/tmp/hoopiq_shot_data.json')
+
+def load_real_shot_data(filepath: Path = SHOT_DATA_FILE) -> Optional[Dict]:
     """Load real shot data from HoopIQ system"""
-    filepath = Path('/tmp/hoopiq_shot_data.json')
     
     if not filepath.exists():
         print("⚠️ HoopIQ data not found. Is the detection system running?")
@@ -18,6 +20,37 @@ def load_real_shot_data() -> Optional[Dict]:
         print(f"Error loading HoopIQ data: {e}")
         return None
 
+def _skip(text: str, pos: int, chars: str) -> int:
+    while pos < len(text) and text[pos] in chars:
+        pos += 1
+    return pos
+
+def find_shot_list(text: str) -> Optional[int]:
+    """
+    Position just past the '[' that opens the shot list in HoopIQ JSON: a
+    top-level list, or the list under the top-level "shots" key. None if
+    the text ends (or the object closes) before it.
+    """
+    decoder = json.JSONDecoder()
+    pos = _skip(text, 0, " \t\r\n")
+    if text.startswith("[", pos):
+        return pos + 1
+    if not text.startswith("{", pos):
+        return None
+    pos += 1
+    while True:
+        pos = _skip(text, pos, " \t\r\n,")
+        if not text.startswith('"', pos):
+            return None
+        try:
+            key, pos = decoder.raw_decode(text, pos)
+            pos = _skip(text, _skip(text, pos, " \t\r\n:"), " \t\r\n")
+            if key == "shots":
+                return pos + 1 if text.startswith("[", pos) else None
+            _, pos = decoder.raw_decode(text, pos)  # skip the value of any other key
+        except json.JSONDecodeError:
+            return None
+
 def get_shot_results() -> List[Dict]:
     """Get shot results in Streamlit format"""
     data = load_real_shot_data()
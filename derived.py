@@ -0,0 +1,192 @@
+# Derived data computed from sessions, memoized in memory and on disk
+# derived.py
+#
+# Every artifact (averages, zone splits, features, replay frames, ...) is a
+# function of one session plus the artifacts it declares as dependencies.
+# Results are keyed on the session's content key (username, number, version,
+# file mtime; see session_loader), so a changed session misses only its own
+# artifacts. Disk copies live in <user dir>/derived/<session_number>/ and
+# carry a fingerprint of the session version and of the artifact code
+# version, including its dependencies', so stale files are recomputed
+# in place. User-level rollups are keyed on the (number, version) of every
+# session they cover, so adding a session only recomputes the rollups.
+
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from storage import user_path
+from session_format import atomic_write
+from shot_flags import component_averages, game_make_average, flags_to_frame, valid_shots, count, GAME_MAKE
+from court_zones import zone_splits, history_zone_splits
+from make_model import session_features
+
+DERIVED_CACHE_ENTRIES = 1024  # artifacts kept in memory, least recently used evicted first
+
+ARTIFACTS = {}
+_memory = OrderedDict()
+_lock = threading.Lock()
+
+# -----------------------------
+# Registry
+# -----------------------------
+class Artifact:
+    """A derived value of one session: compute(session, *dependency values)."""
+
+    def __init__(self, name, compute, depends=(), disk=False, version=1):
+        self.name = name
+        self.compute = compute
+        self.depends = tuple(depends)
+        self.disk = disk
+        self.version = version
+
+    @property
+    def fingerprint(self):
+        """Code version of this artifact and everything it is derived from."""
+        return "|".join([f"{self.name}:{self.version}"] + [ARTIFACTS[d].fingerprint for d in self.depends])
+
+def artifact(name, depends=(), disk=False, version=1):
+    """
+    Register a session artifact. disk=True artifacts must return an array or a
+    dict of arrays. Bump version when the computation changes.
+    """
+    def register(compute):
+        ARTIFACTS[name] = Artifact(name, compute, depends, disk, version)
+        return compute
+    return register
+
+# -----------------------------
+# Memo layers
+# -----------------------------
+def _remember(key, value):
+    with _lock:
+        _memory[key] = value
+        _memory.move_to_end(key)
+        while len(_memory) > DERIVED_CACHE_ENTRIES:
+            _memory.popitem(last=False)
+    return value
+
+def _recall(key):
+    with _lock:
+        if key in _memory:
+            _memory.move_to_end(key)
+            return True, _memory[key]
+    return False, None
+
+def _disk_path(content_key, name):
+    username, number = content_key[0], content_key[1]
+    return user_path(username, "derived", str(number), f"{name}.npz")
+
+def _disk_stamp(content_key, spec):
+    return f"{content_key[2:]}|{spec.fingerprint}"
+
+def _load_disk(path, stamp):
+    try:
+        with np.load(path, allow_pickle=False) as npz:
+            if str(npz["__stamp__"]) != stamp:
+                return None
+            value = {key: npz[key] for key in npz.files if key != "__stamp__"}
+    except (OSError, ValueError, KeyError):
+        return None
+    return value["__value__"] if list(value) == ["__value__"] else value
+
+def _save_disk(path, stamp, value):
+    arrays = {"__value__": value} if isinstance(value, np.ndarray) else dict(value)
+    with atomic_write(path) as f:
+        np.savez(f, __stamp__=np.array(stamp), **arrays)
+
+# -----------------------------
+# Lookup
+# -----------------------------
+def derived(session, name):
+    """
+    Value of artifact `name` for a session, computing it (and its dependencies)
+    only if neither memory nor disk has it for this session's content.
+    Sessions without a content_key (e.g. live ones) are computed directly.
+    """
+    spec = ARTIFACTS[name]
+    content_key = session.get("content_key")
+    if content_key is None:
+        return spec.compute(session, *(derived(session, d) for d in spec.depends))
+
+    key = (content_key, name)
+    found, value = _recall(key)
+    if found:
+        return value
+    if spec.disk:
+        path, stamp = _disk_path(content_key, name), _disk_stamp(content_key, spec)
+        value = _load_disk(path, stamp)
+        if value is not None:
+            return _remember(key, value)
+    value = spec.compute(session, *(derived(session, d) for d in spec.depends))
+    if spec.disk:
+        _save_disk(path, stamp, value)
+    return _remember(key, value)
+
+def rollup(username, name, sessions, compute):
+    """User-level value over many sessions, recomputed only when one of them changes."""
+    key = (username, name, tuple((s["session_number"], s.get("version")) for s in sessions))
+    found, value = _recall(key)
+    if found:
+        return value
+    return _remember(key, compute(sessions))
+
+# -----------------------------
+# Session artifacts
+# -----------------------------
+@artifact("results_table")
+def _results_table(session):
+    return flags_to_frame(session["flags"])
+
+@artifact("averages")
+def _averages(session):
+    return component_averages(session["flags"]), game_make_average(session["flags"])
+
+@artifact("zone_splits")
+def _zone_splits(session):
+    return zone_splits(session["Zone_Attempts"], session["Zone_Makes"])
+
+@artifact("export_tables", depends=("averages",))
+def _export_tables(session, averages):
+    component_avg, _ = averages
+    valid = valid_shots(session["flags"])
+    makes = count(valid, GAME_MAKE)
+    return {
+        "Component Averages": pd.DataFrame([component_avg]).melt(var_name="Component", value_name="Average"),
+        "Game Make Rate": pd.DataFrame({
+            "Total Shots": [len(valid)],
+            "Makes": [makes],
+            "Misses": [len(valid) - makes],
+            "Make %": [makes / len(valid) * 100 if len(valid) else float("nan")],
+        }),
+    }
+
+@artifact("features", disk=True)
+def _features(session):
+    return session_features(session)
+
+# -----------------------------
+# User rollups
+# -----------------------------
+def _summary_table(sessions):
+    df = pd.DataFrame([{
+        "Session Number": s["session_number"],
+        "DateTime": s["datetime"],
+        "Backboard Avg": s["Component_Averages"]["Backboard"],
+        "Rim Avg": s["Component_Averages"]["Rim"],
+        "Net Avg": s["Component_Averages"]["Net"],
+        "Game Make Avg": s["Game_Make_Avg"],
+        "Total Shots": s["Total_Shots"],
+        "Makes": s["Makes"],
+        "Misses": s["Misses"]
+    } for s in sessions])
+    # Sort table newest → oldest
+    return df.sort_values("DateTime", ascending=False).reset_index(drop=True)
+
+def summary_table(username, sessions):
+    """Summary table of many sessions (the "Oldest Sessions" view)."""
+    return rollup(username, "summary_table", sessions, _summary_table)
+
+def history_zones(username, sessions):
+    """Zone splits summed over many sessions."""
+    return rollup(username, "history_zones", sessions, history_zone_splits)
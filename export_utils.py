@@ -6,21 +6,16 @@ import pandas as pd
 import io
 import json
 
-def export_section(df, component_avg):
-    shot_data = df.copy()
-    component_averages = pd.DataFrame([component_avg])
-    component_averages = component_averages.melt(var_name="Component", value_name="Average")
-    
-    game_make_rate = pd.DataFrame({
-        "Total Shots": [len(df)],
-        "Makes": [df['Game Make'].sum()],
-        "Misses": [len(df) - df['Game Make'].sum()],
-        "Make %": [df['Game Make'].mean() * 100]
-    })
+def export_section(df, tables):
+    """
+    Export widgets for the shot table plus the session's summary tables
+    ({name: DataFrame}, see the "export_tables" artifact in derived.py).
+    """
+    export_data = {"Shot Data": df, **tables}
 
     export_options = st.multiselect(
         "Select Data to Export (multiple allowed):",
-        ["Shot Data", "Component Averages", "Game Make Rate"],
+        list(export_data),
         default=["Shot Data"]
     )
 
@@ -29,21 +24,15 @@ def export_section(df, component_avg):
     if st.button("Export"):
         if export_format == "CSV":
             for option in export_options:
-                if option=="Shot Data": data_to_export = shot_data
-                elif option=="Component Averages": data_to_export = component_averages
-                elif option=="Game Make Rate": data_to_export = game_make_rate
-                csv = data_to_export.to_csv(index=False).encode("utf-8")
+                csv = export_data[option].to_csv(index=False).encode("utf-8")
                 st.download_button(label=f"Download {option} CSV", data=csv,
                                    file_name=f"{option.replace(' ','_')}.csv", mime="text/csv")
         elif export_format=="Excel":
             output = io.BytesIO()
             with pd.ExcelWriter(output, engine="openpyxl") as writer:
                 for option in export_options:
-                    if option=="Shot Data": data_to_export = shot_data
-                    elif option=="Component Averages": data_to_export = component_averages
-                    elif option=="Game Make Rate": data_to_export = game_make_rate
                     sheet_name = option[:31]
-                    data_to_export.to_excel(writer, index=False, sheet_name=sheet_name)
+                    export_data[option].to_excel(writer, index=False, sheet_name=sheet_name)
             output.seek(0)
             st.download_button(label="Download Excel", data=output,
                                file_name="Basketball_Shot_Data.xlsx",
@@ -51,10 +40,7 @@ def export_section(df, component_avg):
         elif export_format=="JSON":
             combined_json = {}
             for option in export_options:
-                if option=="Shot Data": data_to_export = shot_data
-                elif option=="Component Averages": data_to_export = component_averages
-                elif option=="Game Make Rate": data_to_export = game_make_rate
-                combined_json[option.replace(' ','_')] = data_to_export.to_dict(orient="records")
+                combined_json[option.replace(' ','_')] = export_data[option].to_dict(orient="records")
             json_data = json.dumps(combined_json, indent=4)
             st.download_button(label="Download JSON", data=json_data,
                                file_name="Basketball_Shot_Data.json", mime="application/json")
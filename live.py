@@ -0,0 +1,250 @@
+# Live dashboard: follow the detection system's output and append new shots as they land
+# live.py
+
+import codecs
+import json
+import os
+import numpy as np
+import pandas as pd
+import streamlit as st
+from data import SHOT_DATA_FILE, find_shot_list
+from shot_flags import (
+    pack_flags, component_counts, valid_shots, flags_to_frame, COMPONENT_BITS, TECHNICAL_COMPONENTS,
+)
+from shot_checks import check_shots
+from plot_utils import top_view_figure, side_view_figure, add_shot_traces
+from projection import ShotTrajectories, pack_trajectories
+
+LIVE_POLL_SECONDS = 1.0
+
+# -----------------------------
+# Feed
+# -----------------------------
+class LiveFeed:
+    """
+    Follows the detection system's output file. Each poll is a single
+    os.stat unless the file changed; only the shots added since the last
+    poll are parsed. An append-only .jsonl file is read from the last
+    offset. A {"shots": [...]} .json file is resumed after the last shot
+    read as long as that shot's bytes are unchanged (the detection system
+    rewrites the file with the new shots appended); otherwise it is read
+    from the start again, and counts as a new run unless it still holds the
+    last shot already read at the same position.
+    """
+
+    def __init__(self, path=SHOT_DATA_FILE):
+        self.path = str(path)
+        self.seen = 0
+        self._stamp = None
+        self._offset = 0
+        self._mark = b""  # .json: the bytes of the last shot read (or of everything before the list)
+        self._last = None  # the last shot read
+
+    def poll(self):
+        """Return (new_shots, reset). reset is True when the source started over."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return [], False
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if stamp == self._stamp:
+            return [], False
+
+        if self.path.endswith(".jsonl"):
+            reset = stat.st_size < self._offset
+            new_shots = self._read_appended(stat.st_size, reset)
+        else:
+            read = self._read_json(stat.st_size)
+            if read is None:
+                return [], False  # mid-write; retry on the next poll
+            shots, restarted = read
+            # A rewrite continues the run only if the shots already read are still there
+            reset = restarted and (len(shots) < self.seen
+                                   or (self.seen > 0 and shots[self.seen - 1] != self._last))
+            new_shots = shots[self.seen:] if restarted and not reset else shots
+        self._stamp = stamp
+        if new_shots:
+            self._last = new_shots[-1]
+        self.seen = len(new_shots) if reset else self.seen + len(new_shots)
+        return new_shots, reset
+
+    def _read_appended(self, size, reset):
+        if reset:
+            self._offset = 0
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            chunk = f.read(size - self._offset)
+        # Leave a partially written last line for the next poll
+        end = chunk.rfind(b"\n") + 1
+        self._offset += end
+        return [json.loads(line) for line in chunk[:end].splitlines() if line.strip()]
+
+    def _read_json(self, size):
+        """
+        (shots, restarted): the shots after the last one read, or every shot
+        when the file had to be read from the start. None while it is mid-write.
+        """
+        resume = 0 < self._offset <= size
+        with open(self.path, "rb") as f:
+            if resume:
+                f.seek(self._offset - len(self._mark))
+                resume = f.read(len(self._mark)) == self._mark
+            if not resume:
+                f.seek(0)
+            chunk = f.read()
+        try:
+            # Holds back a multi-byte character cut off at the end of the read
+            text = codecs.getincrementaldecoder("utf-8")().decode(chunk)
+        except UnicodeDecodeError:
+            return None
+        start = 0
+        if not resume:
+            pos = find_shot_list(text)
+            if pos is None:
+                return None
+            start, text = len(text[:pos].encode("utf-8")), text[pos:]
+
+        decoder = json.JSONDecoder()
+        shots, pos, begin, end, closed = [], 0, 0, 0, False
+        while True:
+            while pos < len(text) and text[pos] in " \t\r\n,":
+                pos += 1
+            if pos == len(text):
+                break
+            if text[pos] == "]":
+                closed = True
+                break
+            try:
+                shot, end = decoder.raw_decode(text, pos)
+            except json.JSONDecodeError:
+                break  # a shot still being written
+            shots.append(shot)
+            begin, pos = pos, end
+        if not resume and not closed:
+            return None
+
+        if shots:
+            # Character positions in text to byte positions in chunk
+            shot_start = start + len(text[:begin].encode("utf-8"))
+            shot_end = shot_start + len(text[begin:end].encode("utf-8"))
+            self._mark = chunk[shot_start:shot_end]
+            self._offset = (self._offset if resume else 0) + shot_end
+        elif not resume:
+            self._mark = chunk[:start]
+            self._offset = start
+        return shots, not resume
+
+# -----------------------------
+# Conversion
+# -----------------------------
+def to_dashboard_shots(raw_shots):
+    """
+    Convert detection-system shots into (flags, shots) as used by the dashboard.
+    Both views are projected from the raw 3D trajectories (see projection.py),
+    and the flags carry the ingest check bits (see shot_checks.py).
+    """
+    flags = pack_flags(
+        [[shot.get(key, True) for key in ("backboard", "rim", "net", "make")] for shot in raw_shots],
+        [shot.get("make", True) for shot in raw_shots],
+    )
+    trajectories = ShotTrajectories(*pack_trajectories([shot["trajectory"] for shot in raw_shots]))
+    x, y, z = trajectories.points
+    flags = check_shots(flags, x, y, z, trajectories.offsets)
+    return flags, trajectories.shots(["Make" if shot.get("make", True) else "Miss" for shot in raw_shots])
+
+# -----------------------------
+# Live session state
+# -----------------------------
+class LiveSession:
+    """
+    Running state of a live session; every update costs O(new shots). Results
+    rows are kept per update and only concatenated when the table is shown.
+    """
+
+    def __init__(self, feed):
+        self.feed = feed
+        self.reset()
+
+    def reset(self):
+        self.totals = np.zeros(len(COMPONENT_BITS), dtype=np.int64)
+        self.valid = 0  # shots that passed the ingest checks
+        self.shots = []
+        self._table_parts = []  # results rows of each update
+        self._table = None      # their concatenation, built when shown
+        self.top_fig = top_view_figure([], [])
+        self.side_fig = side_view_figure([], [])
+        for fig in (self.top_fig, self.side_fig):
+            fig.update_layout(uirevision="live")  # keep zoom/pan between updates
+
+    def update(self):
+        """Pull new shots from the feed. Returns how many were added."""
+        raw_shots, reset = self.feed.poll()
+        if reset:
+            self.reset()
+        if not raw_shots:
+            return 0
+        flags, shots = to_dashboard_shots(raw_shots)
+        first = len(self.shots)
+        self.shots.extend(shots)
+        self.totals += component_counts(flags)
+        self.valid += len(valid_shots(flags))
+        self._table_parts.append(flags_to_frame(flags).set_axis(range(first, len(self.shots))))
+        self._table = None
+
+        new_idx = range(first, len(self.shots))
+        add_shot_traces(self.top_fig, self.shots, new_idx, "top")
+        add_shot_traces(self.side_fig, self.shots, new_idx, "side")
+        return len(raw_shots)
+
+    def table(self):
+        """Results table of every shot so far."""
+        if self._table is None:
+            table = pd.concat(self._table_parts) if self._table_parts else flags_to_frame([])
+            if "Data Check" in table:
+                # Shots from updates without a failed check have no Data Check entry
+                table["Data Check"] = table["Data Check"].fillna("")
+            self._table = table
+            self._table_parts = [table]
+        return self._table
+
+    def averages(self):
+        """Running component averages and game make rate (valid shots only)."""
+        n = self.valid
+        rates = self.totals / n if n else np.full(len(self.totals), np.nan)
+        averages = dict(zip(COMPONENT_BITS, rates.tolist()))
+        return {col: averages[col] for col in TECHNICAL_COMPONENTS}, averages["Game Make"]
+
+# -----------------------------
+# UI
+# -----------------------------
+def live_dashboard():
+    """Live view that follows the detection system without rerunning the whole app."""
+    if "live_session" not in st.session_state:
+        st.session_state.live_session = LiveSession(LiveFeed())
+    st.header("Live Session")
+    st.caption(f"Following {st.session_state.live_session.feed.path} "
+               f"(checks every {LIVE_POLL_SECONDS:g}s)")
+    _live_fragment()
+
+@st.fragment(run_every=LIVE_POLL_SECONDS)
+def _live_fragment():
+    # Each poll reruns only this fragment, not auth or the rest of app.py. Reading the
+    # feed is one os.stat unless it changed; the view is drawn on every run because a
+    # fragment run clears whatever it does not draw again.
+    live = st.session_state.live_session
+    live.update()
+
+    if not live.shots:
+        st.info("Waiting for shots from the detection system...")
+        return
+    component_avg, game_make_avg = live.averages()
+    st.dataframe(live.table())
+    st.markdown("**Technical Component Averages:**")
+    st.write(component_avg)
+    st.write(f"**Overall Game Make Rate:** {game_make_avg:.2f}")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.plotly_chart(live.top_fig, use_container_width=True, key="live_top")
+    with col2:
+        st.plotly_chart(live.side_fig, use_container_width=True, key="live_side")
@@ -0,0 +1,207 @@
+# Concurrent-user load test of the Streamlit app (runs locally, no browser or server)
+# loadtest.py
+#
+# Usage: python loadtest.py [--users 20] [--concurrency 8] [--rounds 3] [--sessions 5] [--shots 50]
+#
+# Seeds synthetic users and sessions into a scratch data root, then drives
+# app.py with Streamlit's app-testing API (streamlit.testing.v1.AppTest):
+# every simulated user logs in through auth_ui, flips through their
+# sessions, clicks the shot-selection buttons and exports. Reports
+# per-interaction latency percentiles, throughput and peak RSS.
+#
+# AppTest installs a process-wide mock runtime for each script run, so runs
+# cannot overlap inside one process. Concurrency comes from worker
+# processes instead; each worker keeps all of its users' tabs open (their
+# session_state stays alive) and interleaves their interactions.
+
+import argparse
+import logging
+import os
+import random
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+APP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+PASSWORD = "LoadTest123"
+APP_TIMEOUT = 120  # seconds per script run before AppTest gives up
+
+# -----------------------------
+# Synthetic data
+# -----------------------------
+def synthetic_shot(rng, shot_id, timestamp, n_points=20):
+    """A detection-system shot (data.py format) arcing from a random spot toward the rim."""
+    from court_zones import RIM_X, RIM_Y
+    x0, y0 = rng.uniform(-22, 22), rng.uniform(RIM_Y + 1, 30)
+    make = rng.random() < 0.45
+    t = np.linspace(0, 1, n_points)
+    return {
+        "shot_id": shot_id,
+        "timestamp": timestamp,
+        "backboard": rng.random() < 0.5,
+        "rim": make or rng.random() < 0.6,
+        "net": make,
+        "make": make,
+        "trajectory": {
+            "x": (x0 + (RIM_X - x0) * t).round(3).tolist(),
+            "y": (y0 + (RIM_Y - y0) * t).round(3).tolist(),
+            "z": (6.5 + 8 * t - 4.5 * t ** 2).round(3).tolist(),
+        },
+    }
+
+def seed_users(n_users, n_sessions, n_shots, seed=0):
+    """Register loadtest users and give each n_sessions sessions. Returns the usernames."""
+    from auth_utils import register
+    from storage import save_sessions
+    from bulk_import import to_raw_session
+
+    rng = random.Random(seed)
+    usernames = [f"loadtest{i:04d}" for i in range(n_users)]
+    start = time.time() - n_sessions * 86400
+    for username in usernames:
+        register(username, PASSWORD)
+        sessions = []
+        for s in range(n_sessions):
+            started = start + s * 86400
+            shots = [synthetic_shot(rng, k, started + 20 * k) for k in range(n_shots)]
+            sessions.append(to_raw_session(s + 1, shots, started))
+        save_sessions(username, sessions)
+    return usernames
+
+# -----------------------------
+# Simulated user
+# -----------------------------
+class SimulatedUser:
+    """One browser tab: an AppTest instance that records how long each interaction takes."""
+
+    def __init__(self, username, timings):
+        from streamlit.testing.v1 import AppTest
+        self.username = username
+        self.at = AppTest.from_file(APP_FILE, default_timeout=APP_TIMEOUT)
+        self.timings = timings
+        self.errors = 0
+
+    def _step(self, name, action=None):
+        start = time.perf_counter()
+        if action is not None:
+            action()
+        self.at.run()
+        elapsed = time.perf_counter() - start
+        errors = len(self.at.exception)
+        self.timings.setdefault(name, []).append(elapsed)
+        self.errors += errors
+        return errors == 0
+
+    def _button(self, label):
+        return next(b for b in self.at.button if b.label == label)
+
+    def login(self):
+        self._step("open")
+        def fill_form():
+            self.at.text_input[0].input(self.username)
+            self.at.text_input[1].input(PASSWORD)
+            self._button("Login").click()
+        self._step("login", fill_form)
+        return bool(self.at.session_state["logged_in"])
+
+    def browse(self):
+        """
+        Visit every session; on individual sessions, click the selection buttons
+        and export. Yields after each session so a worker can interleave users.
+        """
+        for option in range(len(self.at.selectbox[0].options)):
+            self._step("select_session", lambda: self.at.selectbox[0].select_index(option))
+            if any(b.label == "Show All Makes" for b in self.at.button):
+                for label in ("Show All Makes", "Show All Misses", "Select All Shots"):
+                    self._step("shot_buttons", lambda: self._button(label).click())
+                self._step("export", lambda: self._button("Export").click())
+            yield
+
+def run_worker(usernames, rounds):
+    """
+    Drive a group of users in one process: all log in (tabs stay open), then
+    their browsing is interleaved session by session.
+    Returns (timings, errors, baseline RSS MB, peak RSS MB).
+    """
+    logging.disable(logging.WARNING)  # per-rerun deprecation warnings would swamp the report
+    from streamlit.testing.v1 import AppTest
+    from session_cache import peak_rss_mb
+    AppTest.from_file(APP_FILE, default_timeout=APP_TIMEOUT).run()  # warm imports before the baseline
+    timings = {}
+    baseline = peak_rss_mb()
+    users = [SimulatedUser(username, timings) for username in usernames]
+    active = []
+    for user in users:
+        if user.login():
+            active.append(user)
+        else:
+            user.errors += 1
+    for _ in range(rounds):
+        pending = [user.browse() for user in active]
+        while pending:
+            pending = [steps for steps in pending if next(steps, StopIteration) is not StopIteration]
+    return timings, sum(user.errors for user in users), baseline, peak_rss_mb()
+
+# -----------------------------
+# Report
+# -----------------------------
+def report(timings, wall, n_users, workers, errors, rss):
+    interactions = sum(len(v) for v in timings.values())
+    print(f"{n_users} users on {workers} workers, {interactions} interactions in {wall:.1f}s "
+          f"({interactions / max(wall, 1e-9):.1f} interactions/sec), {errors} app exceptions")
+    print(f"{'interaction':<16}{'count':>7}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, values in timings.items():
+        ms = np.asarray(values) * 1000
+        p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+        print(f"{name:<16}{len(ms):>7}{p50:>10.1f}{p90:>10.1f}{p99:>10.1f}{ms.max():>10.1f}")
+    if rss:
+        baseline = max(b for b, _ in rss)
+        peaks = [p for _, p in rss]
+        # One server would hold every tab on top of a single baseline. Each worker
+        # also keeps its own SESSION_CACHE and derived caches, which one server
+        # would share, so the sum of the worker deltas can only overstate it
+        single = baseline + sum(p - b for b, p in rss)
+        print(f"Peak RSS per worker: {max(peaks):.0f} MB (baseline {baseline:.0f} MB); "
+              f"single instance with {n_users} tabs: at most {single:.0f} MB "
+              f"(upper bound: caches are counted once per worker)")
+
+def run_load_test(n_users, concurrency, rounds, n_sessions, n_shots):
+    usernames = seed_users(n_users, n_sessions, n_shots)
+    workers = max(1, min(concurrency, n_users))
+    groups = [usernames[w::workers] for w in range(workers)]
+    timings, errors, rss = {}, 0, []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for worker_timings, worker_errors, baseline, peak in pool.map(run_worker, groups, [rounds] * workers):
+            for name, values in worker_timings.items():
+                timings.setdefault(name, []).extend(values)
+            errors += worker_errors
+            if baseline is not None:
+                rss.append((baseline, peak))
+    wall = time.perf_counter() - start
+    report(timings, wall, n_users, workers, errors, rss)
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test app.py with many simulated users.")
+    parser.add_argument("--users", type=int, default=20, help="simulated users (one tab each)")
+    parser.add_argument("--concurrency", type=int, default=8, help="worker processes (users active at once)")
+    parser.add_argument("--rounds", type=int, default=3, help="times each user browses all sessions")
+    parser.add_argument("--sessions", type=int, default=5, help="synthetic sessions per user")
+    parser.add_argument("--shots", type=int, default=50, help="shots per synthetic session")
+    parser.add_argument("--data-root", help="seed into this directory instead of a scratch one (kept)")
+    args = parser.parse_args()
+
+    # The app reads HOOPIQ_DATA_ROOT at import, so point it at the scratch root first
+    data_root = args.data_root or tempfile.mkdtemp(prefix="hoopiq-loadtest-")
+    os.environ["HOOPIQ_DATA_ROOT"] = data_root
+    try:
+        run_load_test(args.users, args.concurrency, args.rounds, args.sessions, args.shots)
+    finally:
+        if not args.data_root:
+            shutil.rmtree(data_root, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+# Make-probability model: logistic regression on trajectory features, in NumPy
+# make_model.py
+#
+# Usage: python make_model.py [USERNAME ...] [--global]
+#
+# Each user's model lives in their data directory (make_model.npz) and is
+# refreshed incrementally: only sessions it has not seen are featurized, then
+# a few warm-started gradient epochs run over the stored feature rows. The
+# global model (DATA_ROOT/make_model.npz, built with --global) pools every
+# user and is used for players with too few shots of their own. The app only
+# scores with the models; refreshes run here or in a background thread.
+
+import argparse
+import os
+import threading
+import numpy as np
+from court_zones import RIM_X, RIM_Y, RIM_HEIGHT
+from shot_flags import GAME_MAKE, ANOMALY_BITS
+from storage import DATA_ROOT, load_manifest, load_session, user_path
+from session_format import atomic_write
+
+FEATURES = ["Entry Angle", "Apex", "Lateral Offset", "Release Distance"]
+# Fixed centering/scaling (degrees, feet) so warm-started weights stay valid as data grows
+FEATURE_CENTER = np.array([40.0, 14.0, 0.5, 15.0])
+FEATURE_SCALE = np.array([15.0, 4.0, 1.0, 8.0])
+
+LEARNING_RATE = 0.5
+BATCH_SIZE = 1024
+TRAIN_STEPS = 2000     # gradient steps for a fresh model
+REFRESH_STEPS = 200    # warm-started steps after new sessions arrive
+L2 = 1e-3
+MAX_TRAIN_SHOTS = 200_000  # newest rows kept per model
+MIN_USER_SHOTS = 200       # below this the global model scores the user's shots
+GLOBAL_MODEL_FILE = os.path.join(DATA_ROOT, "make_model.npz")
+
+# -----------------------------
+# Features
+# -----------------------------
+def _last_per_shot(candidates, point_shot, n_shots):
+    """Largest of the (sorted) candidate point indices per shot (-1 where a shot has none)."""
+    last = np.full(n_shots, -1, dtype=np.int64)
+    if len(candidates):
+        shots = np.arange(n_shots)
+        cand_shot = point_shot[candidates]
+        pos = np.searchsorted(cand_shot, shots, side="right") - 1
+        found = (pos >= 0) & (cand_shot[pos] == shots)
+        last[found] = candidates[pos[found]]
+    return last
+
+def trajectory_features(x, y, z, offsets):
+    """
+    (n_shots, len(FEATURES)) features for packed 3D trajectories, all shots at once:
+    entry angle (degrees below horizontal where the ball last drops through rim
+    height), apex height, lateral offset from the rim where the ball reaches
+    RIM_Y, and release distance. Shots with fewer than 2 points get NaN rows.
+    """
+    n_shots = len(offsets) - 1
+    features = np.full((n_shots, len(FEATURES)), np.nan)
+    lengths = np.diff(offsets)
+    ok = lengths >= 2
+    if not ok.any():
+        return features
+    keep = np.repeat(ok, lengths)
+    x, y, z, lengths = x[keep], y[keep], z[keep], lengths[ok]
+    n = len(lengths)
+    starts = np.zeros(n, dtype=np.int64)
+    np.cumsum(lengths[:-1], out=starts[1:])
+    ends = starts + lengths - 1
+    point_shot = np.repeat(np.arange(n), lengths)
+
+    # Segments j -> j+1 inside a shot
+    seg = np.ones(len(x) - 1, dtype=bool)
+    seg[ends[:-1]] = False
+
+    # Entry: last downward crossing of rim height (else the final segment)
+    drops = np.flatnonzero(seg & (z[:-1] >= RIM_HEIGHT) & (z[1:] < RIM_HEIGHT))
+    entry = _last_per_shot(drops, point_shot, n)
+    entry = np.where(entry < 0, ends - 1, entry)
+    run = np.hypot(x[entry + 1] - x[entry], y[entry + 1] - y[entry])
+    entry_angle = np.degrees(np.arctan2(z[entry] - z[entry + 1], run))
+
+    # Lateral offset where the ball reaches RIM_Y (interpolated; else the closest point)
+    dy = y - RIM_Y
+    crossings = np.flatnonzero(seg & (dy[:-1] * dy[1:] <= 0))
+    j = _last_per_shot(crossings, point_shot, n)
+    missing = j < 0
+    if missing.any():
+        points = np.flatnonzero(missing[point_shot])
+        order = points[np.lexsort((np.abs(dy[points]), point_shot[points]))]
+        j[missing] = order[np.searchsorted(point_shot[order], np.flatnonzero(missing))]
+    k = np.where(missing, j, j + 1)
+    denom = dy[j] - dy[k]
+    t = np.divide(dy[j], denom, out=np.zeros(n), where=denom != 0)
+    lateral = np.abs(x[j] + (x[k] - x[j]) * t - RIM_X)
+
+    features[ok] = np.column_stack([
+        entry_angle,
+        np.maximum.reduceat(z, starts),
+        lateral,
+        np.hypot(x[starts] - RIM_X, y[starts] - RIM_Y),
+    ])
+    return features
+
+def session_features(session):
+    """Features for every shot in a loaded session (raw 3D or legacy top/side layout)."""
+    trajectories = session.get("trajectories")
+    if trajectories is not None:
+        x, y, z = trajectories.points
+        return trajectory_features(x, y, z, trajectories.offsets)
+    # Legacy sessions: top view gives x/y, side view height gives z
+    shots = session["shots"]
+    lengths = [len(s["top_x"]) if len(s["top_x"]) == len(s["side_y"]) else 0 for s in shots]
+    offsets = np.zeros(len(shots) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    x, y, z = (np.concatenate([np.asarray(s[key], dtype=np.float64) for s, n in zip(shots, lengths) if n] or [[]])
+               for key in ("top_x", "top_y", "side_y"))
+    return trajectory_features(x, y, z, offsets)
+
+def make_labels(flags):
+    return (np.asarray(flags, dtype=np.uint8) & np.uint8(GAME_MAKE)) != 0
+
+# -----------------------------
+# Model
+# -----------------------------
+class MakeModel:
+    """
+    Logistic regression over FEATURES. Keeps the feature rows it was trained on
+    (tagged by session key) so refreshes can warm-start over all of them, and
+    the keys of every session it has featurized, including sessions that left
+    no rows (no usable shots, or trimmed to MAX_TRAIN_SHOTS).
+    """
+
+    def __init__(self, weights=None, X=None, y=None, row_keys=None, seen_keys=None):
+        self.weights = np.zeros(len(FEATURES) + 1) if weights is None else weights
+        self.X = np.empty((0, len(FEATURES)), dtype=np.float32) if X is None else X
+        self.y = np.empty(0, dtype=bool) if y is None else y
+        self.row_keys = np.empty(0, dtype=str) if row_keys is None else row_keys
+        self.seen_keys = np.unique(self.row_keys) if seen_keys is None else seen_keys
+        self._trained_keys = None
+
+    def __len__(self):
+        return len(self.y)
+
+    @property
+    def trained_keys(self):
+        """Session keys the model has featurized (computed once per update)."""
+        if self._trained_keys is None:
+            self._trained_keys = set(self.seen_keys.tolist())
+        return self._trained_keys
+
+    def predict(self, features):
+        """Make probability per row (NaN for rows without features), in one matrix multiply."""
+        scaled = (np.asarray(features, dtype=np.float64) - FEATURE_CENTER) / FEATURE_SCALE
+        return 1 / (1 + np.exp(-(scaled @ self.weights[1:] + self.weights[0])))
+
+    def update(self, X, y, keys, session_keys, drop_keys=(), steps=REFRESH_STEPS, seed=0):
+        """
+        Add the rows of the sessions in session_keys (dropping those of drop_keys),
+        then run about `steps` mini-batch gradient steps if the rows changed.
+        """
+        located = ~np.isnan(X).any(axis=1)
+        keep = ~np.isin(self.row_keys, list(drop_keys))
+        self.X = np.concatenate([self.X[keep], X[located].astype(np.float32)])[-MAX_TRAIN_SHOTS:]
+        self.y = np.concatenate([self.y[keep], y[located]])[-MAX_TRAIN_SHOTS:]
+        self.row_keys = np.concatenate([self.row_keys[keep], keys[located]])[-MAX_TRAIN_SHOTS:]
+        self.seen_keys = np.union1d(np.setdiff1d(self.seen_keys, list(drop_keys)), list(session_keys))
+        self._trained_keys = None
+        if len(self.y) and (located.any() or not keep.all()):
+            self.fit(max(1, steps * BATCH_SIZE // len(self.y)), seed)
+
+    def fit(self, epochs, seed=0):
+        """Mini-batch gradient descent on the stored rows, starting from the current weights."""
+        rng = np.random.default_rng(seed)
+        X = np.column_stack([np.ones(len(self.y)), (self.X - FEATURE_CENTER) / FEATURE_SCALE])
+        y = self.y.astype(np.float64)
+        w = self.weights.copy()
+        for _ in range(epochs):
+            order = rng.permutation(len(y))
+            for start in range(0, len(y), BATCH_SIZE):
+                batch = order[start:start + BATCH_SIZE]
+                p = 1 / (1 + np.exp(-(X[batch] @ w)))
+                grad = X[batch].T @ (p - y[batch]) / len(batch)
+                grad[1:] += L2 * w[1:]
+                w -= LEARNING_RATE * grad
+        self.weights = w
+
+    def save(self, path):
+        with atomic_write(path) as f:
+            np.savez(f, weights=self.weights, X=self.X, y=self.y, row_keys=self.row_keys,
+                     seen_keys=self.seen_keys)
+
+    @classmethod
+    def load(cls, path):
+        """Load a saved model (a fresh one if the file does not exist)."""
+        if not os.path.exists(path):
+            return cls()
+        with np.load(path, allow_pickle=False) as npz:
+            # Models saved before seen_keys was kept fall back to their row keys
+            seen_keys = npz["seen_keys"] if "seen_keys" in npz.files else None
+            return cls(npz["weights"], npz["X"], npz["y"], npz["row_keys"], seen_keys)
+
+# -----------------------------
+# Training
+# -----------------------------
+def _session_key(username, entry, prefix_user):
+    key = f"{entry['session_number']}:{entry['version']}"
+    return f"{username}:{key}" if prefix_user else key
+
+def refresh_model(model, usernames, prefix_user=False):
+    """
+    Bring a model up to date with the users' manifests: featurize only sessions
+    it has not seen, drop rows of replaced or deleted sessions. Returns True if it changed.
+    """
+    trained = model.trained_keys
+    current, new = set(), []
+    for username in usernames:
+        for entry in load_manifest(username)["sessions"]:
+            if entry.get("file"):
+                key = _session_key(username, entry, prefix_user)
+                current.add(key)
+                if key not in trained:
+                    new.append((username, entry, key))
+    stale = trained - current
+    if not new and not stale:
+        return False
+
+    X, y, keys = [np.empty((0, len(FEATURES)))], [np.empty(0, dtype=bool)], [np.empty(0, dtype=str)]
+    for username, entry, key in new:
+        session = load_session(username, entry)
+        features = session_features(session)
+        # Shots that failed the ingest checks are not trained on
+        features[(session["flags"] & ANOMALY_BITS) != 0] = np.nan
+        X.append(features)
+        y.append(make_labels(session["flags"]))
+        keys.append(np.full(len(session["flags"]), key))
+    steps = TRAIN_STEPS if not len(model) else REFRESH_STEPS
+    model.update(np.concatenate(X), np.concatenate(y), np.concatenate(keys),
+                 [key for _, _, key in new], stale, steps)
+    return True
+
+_models = {}         # username -> MakeModel, shared by every tab in the process
+_requested = {}      # username -> session keys a background refresh was started for
+_refreshing = set()  # users with a background refresh running
+_global_model = {}   # file mtime -> MakeModel
+_models_lock = threading.Lock()  # guards the dicts and set above
+
+def _cached_model(username):
+    with _models_lock:
+        model = _models.get(username)
+    if model is None:
+        loaded = MakeModel.load(user_path(username, "make_model.npz"))
+        with _models_lock:
+            model = _models.setdefault(username, loaded)
+    return model
+
+def refresh_user_model(username):
+    """The user's own model, refreshed with any new sessions and saved if it changed."""
+    model = _cached_model(username)
+    # Refresh a copy so tabs scoring with the cached model never see it half-updated
+    # (update replaces the row arrays instead of writing into them)
+    fresh = MakeModel(model.weights, model.X, model.y, model.row_keys, model.seen_keys)
+    if not refresh_model(fresh, [username]):
+        return model
+    fresh.save(user_path(username, "make_model.npz"))
+    with _models_lock:
+        _models[username] = fresh
+    return fresh
+
+def _refresh_in_background(username):
+    try:
+        refresh_user_model(username)
+    finally:
+        with _models_lock:
+            _refreshing.discard(username)
+            # Sessions still missing from the model (e.g. the refresh failed) can be requested again
+            _requested.pop(username, None)
+
+def global_make_model():
+    """The global model (None until built with --global), reloaded when its file changes."""
+    try:
+        mtime = os.stat(GLOBAL_MODEL_FILE).st_mtime_ns
+    except OSError:
+        return None
+    with _models_lock:
+        model = _global_model.get(mtime)
+    if model is None:
+        model = MakeModel.load(GLOBAL_MODEL_FILE)
+        with _models_lock:
+            _global_model.clear()
+            _global_model[mtime] = model
+    return model
+
+def user_make_model(username, sessions=()):
+    """
+    The model that scores a user's shots: their own, or the global model
+    while they have fewer than MIN_USER_SHOTS (None if neither has been
+    trained). Never trains: if one of the loaded `sessions` is new to the
+    user's model, a background refresh starts and later reruns pick it up.
+    """
+    model = _cached_model(username)
+    keys = {_session_key(username, s, False) for s in sessions} - model.trained_keys
+    with _models_lock:
+        requested = _requested.setdefault(username, set())
+        start = bool(keys - requested) and username not in _refreshing
+        if start:
+            requested |= keys
+            _refreshing.add(username)
+    if start:
+        threading.Thread(target=_refresh_in_background, args=(username,), daemon=True).start()
+    if len(model) < MIN_USER_SHOTS:
+        return global_make_model() or (model if len(model) else None)
+    return model
+
+def predict_session(model, session):
+    """Predicted make probability for every shot of a loaded session."""
+    return model.predict(session_features(session))
+
+def main():
+    from compaction import iter_usernames
+    parser = argparse.ArgumentParser(description="Train or refresh make-probability models.")
+    parser.add_argument("usernames", nargs="*", help="users to refresh (default: all)")
+    parser.add_argument("--global", dest="global_model", action="store_true",
+                        help="refresh the global model pooled over the users instead")
+    args = parser.parse_args()
+    usernames = args.usernames or list(iter_usernames())
+    if args.global_model:
+        model = MakeModel.load(GLOBAL_MODEL_FILE)
+        if refresh_model(model, usernames, prefix_user=True):
+            model.save(GLOBAL_MODEL_FILE)
+        print(f"Global model: {len(model):,} shots, weights {np.round(model.weights, 3).tolist()}")
+        return
+    for username in usernames:
+        model = refresh_user_model(username)
+        print(f"{username}: {len(model):,} shots, weights {np.round(model.weights, 3).tolist()}")
+
+if __name__ == "__main__":
+    main()
@@ -5,20 +5,40 @@ import plotly.graph_objects as go
 import math
 import numpy as np
 import streamlit as st
+from court_zones import (
+    COURT_WIDTH, COURT_LENGTH, RIM_X, RIM_Y, RIM_HEIGHT, RIM_SIDE_X, KEY_WIDTH, KEY_LENGTH, RADIUS_3PT,
+    CORNER_DISTANCE,
+)
+
+# -----------------------------
+# Shot traces
+# -----------------------------
+def add_shot_traces(fig, shots, selected_idx, view):
+    """Add one trajectory trace per selected shot; view is "top" or "side"."""
+    for i in selected_idx:
+        shot = shots[i]
+        color = "green" if shot['result']=="Make" else "red"
+        fig.add_trace(go.Scatter(x=shot[f'{view}_x'], y=shot[f'{view}_y'],
+                                 mode='lines+markers', line=dict(color=color, width=3),
+                                 marker=dict(size=6),
+                                 name=f"Shot {i+1} ({shot['result']})"))
 
 # -----------------------------
 # Top View Plot
 # -----------------------------
 def plot_top_view(shots, selected_idx):
+    st.plotly_chart(top_view_figure(shots, selected_idx), use_container_width=True)
+
+def top_view_figure(shots, selected_idx):
     fig = go.Figure()
 
     # -----------------------------
     # Draw court outline rim, and backboard
     # -----------------------------
-    court_width, court_length = 50, 47
+    court_width, court_length = COURT_WIDTH, COURT_LENGTH
     fig.add_shape(type="rect", x0=-court_width/2, y0=0, x1=court_width/2, y1=court_length,
                   line=dict(color="gray", width=2))
-    rim_y, rim_x = 5.25, 0
+    rim_y, rim_x = RIM_Y, RIM_X
     backboard_width = 6
     backboard_y = rim_y - 0.5
     fig.add_shape(type="line", x0=-backboard_width/2, y0=backboard_y, x1=backboard_width/2,
@@ -30,8 +50,8 @@ def plot_top_view(shots, selected_idx):
     # -----------------------------
     # Key Box
     # -----------------------------
-    box_width = 12
-    box_length = 19
+    box_width = KEY_WIDTH
+    box_length = KEY_LENGTH
     fig.add_shape(type="rect", x0=-box_width/2, y0=0, x1=box_width/2, y1=box_length,
                   line=dict(color="orange", width=2))
 
@@ -41,15 +61,15 @@ def plot_top_view(shots, selected_idx):
     theta = np.linspace(0, math.pi, 50)
     arc_radius = 6
     arc_x = arc_radius * np.cos(theta)
-    arc_y = 19 + arc_radius * np.sin(theta)
+    arc_y = box_length + arc_radius * np.sin(theta)
     fig.add_trace(go.Scatter(x=arc_x, y=arc_y, mode='lines', line=dict(color="orange")))
 
     # -----------------------------
     # 3-point line
     # -----------------------------
-    radius_3pt = 19.75
-    x_left = -(court_width/2 - 5.25)
-    x_right = (court_width/2 - 5.25)
+    radius_3pt = RADIUS_3PT
+    x_left = -(court_width/2 - CORNER_DISTANCE)
+    x_right = (court_width/2 - CORNER_DISTANCE)
     theta_left = math.asin(x_left / radius_3pt)
     theta_right = math.asin(x_right / radius_3pt)
     theta_vals = np.linspace(theta_left, theta_right, 100)
@@ -60,7 +80,7 @@ def plot_top_view(shots, selected_idx):
     # -----------------------------
     # 3-Point Corner Lines
     # -----------------------------
-    corner_distance = 5.25
+    corner_distance = CORNER_DISTANCE
     x_left_corner = -court_width/2 + corner_distance
     y_left_top = rim_y + math.sqrt(radius_3pt**2 - (x_left_corner - rim_x)**2)
     fig.add_shape(type="line", x0=x_left_corner, y0=0, x1=x_left_corner, y1=y_left_top,
@@ -73,29 +93,27 @@ def plot_top_view(shots, selected_idx):
     # -----------------------------
     # Plot selected shot
     # -----------------------------
-    for i in selected_idx:
-        shot = shots[i]
-        color = "green" if shot['result']=="Make" else "red"
-        fig.add_trace(go.Scatter(x=shot['top_x'], y=shot['top_y'],
-                                 mode='lines+markers', line=dict(color=color, width=3),
-                                 marker=dict(size=6),
-                                 name=f"Shot {i+1} ({shot['result']})"))
+    add_shot_traces(fig, shots, selected_idx, "top")
     fig.update_layout(title="Top View of Ball Trajectory", xaxis=dict(range=[-25,25], scaleanchor="y", scaleratio=1),
                       yaxis=dict(range=[0,50]), height=500)
-    st.plotly_chart(fig, use_container_width=True)
+    return fig
 
 # -----------------------------
 # Side View Plot
 # -----------------------------
 def plot_side_view(shots, selected_idx):
+    st.plotly_chart(side_view_figure(shots, selected_idx), use_container_width=True)
+
+def side_view_figure(shots, selected_idx):
     fig = go.Figure()
 
     # -----------------------------
     # Side view backboard
     # -----------------------------
-    rim_height = 10
+    rim_height = RIM_HEIGHT
     backboard_height = 3.5
-    backboard_x = 40
+    rim_offset_from_backboard = 0.5
+    backboard_x = RIM_SIDE_X + rim_offset_from_backboard
     backboard_bottom_y = rim_height - backboard_height + 2.5
     backboard_top_y = backboard_bottom_y + backboard_height
 
@@ -105,7 +123,6 @@ def plot_side_view(shots, selected_idx):
     # Rim
     # -----------------------------
     rim_length = 1.5
-    rim_offset_from_backboard = 0.5
     rim_x_left = backboard_x - rim_offset_from_backboard - rim_length/2
     rim_x_right = backboard_x - rim_offset_from_backboard + rim_length/2
     fig.add_shape(type="line", x0=rim_x_left, y0=rim_height,
@@ -152,14 +169,8 @@ def plot_side_view(shots, selected_idx):
     # -----------------------------
     # Plot selected shot
     # -----------------------------
-    for i in selected_idx:
-        shot = shots[i]
-        color = "green" if shot['result']=="Make" else "red"
-        fig.add_trace(go.Scatter(x=shot['side_x'], y=shot['side_y'],
-                                 mode='lines+markers', line=dict(color=color, width=3),
-                                 marker=dict(size=6),
-                                 name=f"Shot {i+1} ({shot['result']})"))
+    add_shot_traces(fig, shots, selected_idx, "side")
     fig.update_layout(title="Side View of Ball Trajectory",
                       xaxis_title="Distance from Shooter (ft)", yaxis_title="Height (ft)",
                       xaxis=dict(range=[-5,45]), yaxis=dict(range=[0,15]), height=500)
-    st.plotly_chart(fig, use_container_width=True)
+    return fig
@@ -0,0 +1,96 @@
+# Top and side views derived from raw 3D trajectories
+# projection.py
+
+from collections.abc import Mapping
+from functools import cached_property
+import numpy as np
+from court_zones import RIM_X, RIM_Y, RIM_SIDE_X
+
+VIEW_KEYS = ("top_x", "top_y", "side_x", "side_y")
+
+def pack_trajectories(trajectories):
+    """Concatenate per-shot {"x", "y", "z"} point lists into (3, P) points plus offsets."""
+    lengths = [len(t["x"]) for t in trajectories]
+    offsets = np.zeros(len(trajectories) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    points = np.empty((3, offsets[-1]), dtype=np.float64)
+    for row, axis in enumerate("xyz"):
+        points[row] = [v for t in trajectories for v in t[axis]]
+    return points, offsets
+
+def project_side_view(x, y, z, offsets):
+    """
+    Side view for every shot at once: position along the line from the
+    release point toward the rim, against height. Positions are placed so
+    that the rim lands at RIM_SIDE_X, where side_view_figure draws it.
+    Returns a (2, P) array aligned with the input points.
+    """
+    lengths = np.diff(offsets)
+    if not len(x):
+        return np.empty((2, 0))
+    starts = np.minimum(offsets[:-1], len(x) - 1)
+    x0, y0 = x[starts], y[starts]
+
+    # Unit direction toward the rim; straight at the baseline if released over the rim
+    dx, dy = RIM_X - x0, RIM_Y - y0
+    norm = np.hypot(dx, dy)
+    at_rim = norm < 1e-9
+    ux = np.where(at_rim, 0.0, dx / np.where(at_rim, 1.0, norm))
+    uy = np.where(at_rim, -1.0, dy / np.where(at_rim, 1.0, norm))
+
+    # Broadcast per-shot values to their points
+    ux, uy = np.repeat(ux, lengths), np.repeat(uy, lengths)
+    to_rim = (RIM_X - x) * ux + (RIM_Y - y) * uy
+    return np.stack([RIM_SIDE_X - to_rim, z])
+
+class ShotTrajectories:
+    """Packed 3D trajectories of one session; views are projected once, on first use."""
+
+    def __init__(self, points, offsets):
+        self.points = points
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def top(self):
+        return self.points[:2]
+
+    @cached_property
+    def side(self):
+        x, y, z = self.points
+        return project_side_view(x, y, z, self.offsets)
+
+    def view(self, key, k):
+        """Coordinates of one shot for a VIEW_KEYS key, as a view into the packed arrays."""
+        view, axis = key.split("_")
+        rows = self.top if view == "top" else self.side
+        return rows[0 if axis == "x" else 1, self.offsets[k]:self.offsets[k + 1]]
+
+    def shots(self, results):
+        """Dashboard shot records ({"top_x", ..., "result"}) backed by this object."""
+        return [ProjectedShot(self, k, result) for k, result in enumerate(results)]
+
+class ProjectedShot(Mapping):
+    """A shot record whose view coordinates are read from its ShotTrajectories on access."""
+
+    __slots__ = ("trajectories", "index", "result")
+
+    def __init__(self, trajectories, index, result):
+        self.trajectories = trajectories
+        self.index = index
+        self.result = result
+
+    def __getitem__(self, key):
+        if key == "result":
+            return self.result
+        if key not in VIEW_KEYS:
+            raise KeyError(key)
+        return self.trajectories.view(key, self.index)
+
+    def __iter__(self):
+        return iter(VIEW_KEYS + ("result",))
+
+    def __len__(self):
+        return len(VIEW_KEYS) + 1
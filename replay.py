@@ -0,0 +1,108 @@
+# Animated replay of selected shots on the top and side views
+# replay.py
+
+import numpy as np
+import plotly.graph_objects as go
+import streamlit as st
+from plot_utils import top_view_figure, side_view_figure
+from derived import artifact, derived
+
+FRAME_BUDGET = 30        # frames per replay, whatever the sensor sampling rate
+FRAME_MS = 40            # frame duration in the browser
+
+# -----------------------------
+# Frames
+# -----------------------------
+def resample_trajectories(x, y, offsets, n_frames):
+    """
+    Positions of every packed trajectory at n_frames evenly spaced times.
+    Each shot's samples are spread over the same [0, 1] timeline, so all
+    shots leave the hand together. Returns (n_frames, n_shots) arrays.
+    """
+    starts, lengths = offsets[:-1], np.diff(offsets)
+    t = np.linspace(0, 1, n_frames)[:, None]
+    pos = t * (lengths - 1)
+    i0 = np.minimum(np.floor(pos).astype(np.int64), np.maximum(lengths - 2, 0))
+    frac = pos - i0
+    a = starts + i0
+    b = np.minimum(a + 1, starts + lengths - 1)
+    return x[a] + (x[b] - x[a]) * frac, y[a] + (y[b] - y[a]) * frac
+
+def replay_frames(shots, view, n_frames=FRAME_BUDGET):
+    """
+    Ball positions per frame for every shot of a session: "xs" and "ys" are
+    (n_frames, n_shots) arrays (NaN for shots without trajectory points, which
+    "has_points" marks), rounded to two decimals (~1/8 inch) to keep frames small.
+    """
+    lengths = np.array([len(shot[f"{view}_x"]) for shot in shots], dtype=np.int64)
+    has_points = lengths > 0
+    tracked = np.flatnonzero(has_points)
+    offsets = np.zeros(len(tracked) + 1, dtype=np.int64)
+    np.cumsum(lengths[tracked], out=offsets[1:])
+    x = np.concatenate([np.asarray(shots[i][f"{view}_x"], dtype=np.float64) for i in tracked] or [[]])
+    y = np.concatenate([np.asarray(shots[i][f"{view}_y"], dtype=np.float64) for i in tracked] or [[]])
+    xs = np.full((n_frames, len(shots)), np.nan)
+    ys = np.full((n_frames, len(shots)), np.nan)
+    xs[:, tracked], ys[:, tracked] = resample_trajectories(x, y, offsets, n_frames)
+    return {"xs": np.round(xs, 2), "ys": np.round(ys, 2), "has_points": has_points}
+
+@artifact("replay_top", disk=True)
+def _replay_top(session):
+    return replay_frames(session["shots"], "top")
+
+@artifact("replay_side", disk=True, version=2)
+def _replay_side(session):
+    return replay_frames(session["shots"], "side")
+
+def replay_positions(session, selected_idx, view):
+    """
+    Ball positions per frame for the selected shots, sliced from the session's
+    replay frames (computed once per session version, see derived.py).
+    Returns (xs, ys, shot_idx); shots without trajectory points are skipped.
+    """
+    frames = derived(session, f"replay_{view}")
+    shot_idx = [i for i in selected_idx if frames["has_points"][i]]
+    return frames["xs"][:, shot_idx], frames["ys"][:, shot_idx], shot_idx
+
+def add_replay(fig, xs, ys, colors, names):
+    """
+    Add a decimated trail and an animated ball per shot to a figure. Frames
+    only update the ball trace; the court and trails are sent once.
+    """
+    for j, (color, name) in enumerate(zip(colors, names)):
+        fig.add_trace(go.Scatter(x=xs[:, j], y=ys[:, j], mode='lines', name=name,
+                                 line=dict(color=color, width=2), opacity=0.5))
+    ball = len(fig.data)
+    fig.add_trace(go.Scatter(x=xs[0], y=ys[0], mode="markers", showlegend=False, name="Ball",
+                             marker=dict(size=12, color=colors, line=dict(color="black", width=1))))
+    fig.frames = [go.Frame(data=[go.Scatter(x=xs[k], y=ys[k])], traces=[ball], name=str(k))
+                  for k in range(len(xs))]
+    fig.update_layout(updatemenus=[dict(
+        type="buttons", showactive=False, x=0, y=1.12, xanchor="left",
+        buttons=[
+            dict(label="▶ Replay", method="animate",
+                 args=[None, dict(frame=dict(duration=FRAME_MS, redraw=False),
+                                  transition=dict(duration=0), fromcurrent=False)]),
+            dict(label="⏸ Pause", method="animate",
+                 args=[[None], dict(frame=dict(duration=0, redraw=False), mode="immediate")]),
+        ],
+    )])
+    return fig
+
+# -----------------------------
+# Replay plots
+# -----------------------------
+def _plot_replay(fig, session, selected_idx, view):
+    shots = session["shots"]
+    xs, ys, shot_idx = replay_positions(session, selected_idx, view)
+    if shot_idx:
+        colors = ["green" if shots[i]['result']=="Make" else "red" for i in shot_idx]
+        names = [f"Shot {i+1} ({shots[i]['result']})" for i in shot_idx]
+        add_replay(fig, xs, ys, colors, names)
+    st.plotly_chart(fig, use_container_width=True)
+
+def plot_top_replay(session, selected_idx):
+    _plot_replay(top_view_figure(session["shots"], []), session, selected_idx, "top")
+
+def plot_side_replay(session, selected_idx):
+    _plot_replay(side_view_figure(session["shots"], []), session, selected_idx, "side")
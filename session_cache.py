@@ -0,0 +1,176 @@
+# Process-wide cache of loaded sessions, shared by every browser tab
+# session_cache.py
+#
+# Streamlit serves all tabs from one process, so a session opened on ten
+# screens is loaded once and the same read-only object is handed to each.
+# Tabs hold a Lease on the sessions they are showing; leased entries are
+# never evicted, the rest are evicted least recently used once the cache
+# is over its memory budget (HOOPIQ_CACHE_MB, default 256).
+
+import os
+import sys
+import threading
+import weakref
+from collections import OrderedDict
+from types import MappingProxyType
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+CACHE_MB = float(os.environ.get("HOOPIQ_CACHE_MB", 256))
+
+# -----------------------------
+# Sizing and freezing
+# -----------------------------
+def session_nbytes(session):
+    """Approximate memory held by a loaded session (arrays plus per-shot records)."""
+    size = sum(v.nbytes for v in session.values() if isinstance(v, np.ndarray))
+    trajectories = session.get("trajectories")
+    if trajectories is not None:
+        # Points, offsets and the side view (2 of 3 rows) once it is projected
+        size += trajectories.points.nbytes * 5 // 3 + trajectories.offsets.nbytes
+    for shot in session.get("shots", ()):
+        size += sys.getsizeof(shot)
+        if isinstance(shot, dict):
+            size += sum(v.nbytes for v in shot.values() if isinstance(v, np.ndarray))
+    return size
+
+def freeze_session(session):
+    """Read-only view of a session; its arrays are made read-only as well, since tabs share them."""
+    arrays = [v for v in session.values() if isinstance(v, np.ndarray)]
+    trajectories = session.get("trajectories")
+    if trajectories is not None:
+        arrays += [trajectories.points, trajectories.offsets]
+    else:
+        arrays += [v for shot in session.get("shots", ()) for v in shot.values() if isinstance(v, np.ndarray)]
+    for array in arrays:
+        array.setflags(write=False)
+    return MappingProxyType(session)
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far (None where unsupported)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def current_rss_mb():
+    """Resident set size of this process (peak RSS where the current value is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return peak_rss_mb()
+
+# -----------------------------
+# Cache
+# -----------------------------
+class SessionCache:
+    """
+    Reference-counted LRU cache of immutable session objects with a memory budget.
+    Keys identify a session's content (see session_loader.session_cache_key),
+    so a rewritten session is simply a new key and its stale entry ages out.
+    """
+
+    def __init__(self, budget_mb=CACHE_MB):
+        self.budget = int(budget_mb * 1024 * 1024)
+        self._entries = OrderedDict()  # key -> [value, nbytes, refs]
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key, loader, pin=False):
+        """Cached value for key, calling loader() on a miss. pin=True also takes a reference."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                entry[2] += pin
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        # Load outside the lock so one slow read does not block other tabs
+        value = freeze_session(loader())
+        nbytes = session_nbytes(value)
+        with self._lock:
+            if key in self._entries:  # another tab loaded it meanwhile
+                self._entries[key][2] += pin
+                return self._entries[key][0]
+            self._entries[key] = [value, nbytes, int(pin)]
+            self.nbytes += nbytes
+            self._evict()
+        return value
+
+    def _evict(self):
+        # Least recently used first; entries a tab is showing stay put
+        for key in list(self._entries):
+            if self.nbytes <= self.budget:
+                break
+            value, nbytes, refs = self._entries[key]
+            if refs == 0:
+                del self._entries[key]
+                self.nbytes -= nbytes
+                self.evictions += 1
+
+    def acquire(self, keys):
+        with self._lock:
+            for key in keys:
+                if key in self._entries:
+                    self._entries[key][2] += 1
+
+    def release(self, keys):
+        with self._lock:
+            for key in keys:
+                if key in self._entries:
+                    self._entries[key][2] -= 1
+            self._evict()
+
+    def lease(self):
+        return Lease(self)
+
+    def stats(self):
+        """Entry counts, bytes, hit/miss/eviction counters and process RSS."""
+        with self._lock:
+            leased = [e for e in self._entries.values() if e[2] > 0]
+            return {
+                "entries": len(self._entries),
+                "leased_entries": len(leased),
+                "cached_mb": round(self.nbytes / (1024 * 1024), 2),
+                "leased_mb": round(sum(e[1] for e in leased) / (1024 * 1024), 2),
+                "budget_mb": round(self.budget / (1024 * 1024), 2),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "rss_mb": None if (rss := current_rss_mb()) is None else round(rss, 1),
+            }
+
+class Lease:
+    """
+    The cache keys one tab is currently showing. Kept in st.session_state;
+    its keys are released when the tab moves on or its state is discarded.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.keys = set()
+        # Release on garbage collection without keeping the lease itself alive
+        self._finalizer = weakref.finalize(self, cache.release, self.keys)
+
+    def get(self, key, loader):
+        """Cached value for key, held by this lease from the moment it is loaded."""
+        value = self.cache.get(key, loader, pin=key not in self.keys)
+        self.keys.add(key)
+        return value
+
+    def hold(self, keys):
+        """Hold exactly these keys, releasing the ones held before."""
+        keys = set(keys)
+        self.cache.acquire(keys - self.keys)
+        self.cache.release(self.keys - keys)
+        self.keys.clear()
+        self.keys.update(keys)
+
+SESSION_CACHE = SessionCache()
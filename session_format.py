@@ -0,0 +1,363 @@
+# Versioned binary on-disk format for session files
+# session_format.py
+
+import contextlib
+import json
+import os
+import tempfile
+import numpy as np
+from shot_flags import (
+    pack_flags, component_averages, game_make_average, count, valid_shots, RESULT_MAKE, GAME_MAKE,
+    INCONSISTENT,
+)
+from shot_checks import check_shots
+from court_zones import ZONES, shot_zones, zone_counts
+from projection import ShotTrajectories, pack_trajectories
+
+# Bump whenever the array layout below changes; readers migrate older versions
+FORMAT_VERSION = 4  # v4: flags carry the ingest check bits (see shot_checks.py)
+
+COMPONENTS = ["Backboard", "Rim", "Net", "Game Make"]
+RESULTS = ("Make", "Miss")
+SUMMARY_FIELDS = ["Component_Averages", "Game_Make_Avg", "Total_Shots", "Makes", "Misses"]
+ZONE_FIELDS = ["Zone_Attempts", "Zone_Makes"]  # per-zone counts aligned with court_zones.ZONES
+# Per-session arrays holding trajectory points (everything else is flags/metadata)
+TRAJECTORY_ARRAYS = ["xyz", "xyz_offsets", "top", "top_offsets", "side", "side_offsets"]
+
+
+class SessionFormatError(ValueError):
+    """Raised when a session file does not match the expected structure."""
+
+
+# -----------------------------
+# Validation
+# -----------------------------
+def _fail(where, message):
+    raise SessionFormatError(f"{where}: {message}")
+
+def _check_number(value, where, integer=False):
+    valid = int if integer else (int, float)
+    if isinstance(value, bool) or not isinstance(value, valid):
+        _fail(where, f"expected {'an integer' if integer else 'a number'}, got {value!r}")
+
+def _check_values(values, where):
+    # Plain JSON numbers pass the fast check; otherwise find the offending point
+    if not all(type(v) in (int, float) for v in values):
+        for j, value in enumerate(values):
+            _check_number(value, f"{where}[{j}]")
+
+def _check_points(shot, x_key, y_key, where):
+    xs, ys = shot.get(x_key), shot.get(y_key)
+    if not isinstance(xs, list) or not isinstance(ys, list):
+        _fail(where, f"'{x_key}' and '{y_key}' must be lists")
+    if len(xs) != len(ys):
+        _fail(where, f"'{x_key}' has {len(xs)} points but '{y_key}' has {len(ys)}")
+    _check_values(xs, f"{where}.{x_key}")
+    _check_values(ys, f"{where}.{y_key}")
+
+def _check_trajectory(shot, where):
+    trajectory = shot["trajectory"]
+    if not isinstance(trajectory, dict) or not all(isinstance(trajectory.get(a), list) for a in "xyz"):
+        _fail(where, "'trajectory' must have 'x', 'y' and 'z' lists")
+    lengths = {a: len(trajectory[a]) for a in "xyz"}
+    if len(set(lengths.values())) != 1:
+        _fail(where, f"trajectory lengths differ: {lengths}")
+    for a in "xyz":
+        _check_values(trajectory[a], f"{where}.trajectory.{a}")
+
+def validate_session(session, where="session"):
+    """
+    Check one raw (JSON) session in a single pass.
+    Raises SessionFormatError naming the first offending field.
+    """
+    if not isinstance(session, dict):
+        _fail(where, "expected an object")
+    if "session_number" not in session:
+        _fail(where, "missing 'session_number'")
+    _check_number(session["session_number"], f"{where}.session_number", integer=True)
+    if not isinstance(session.get("datetime"), str):
+        _fail(where, "missing or non-string 'datetime'")
+    where = f"session {session['session_number']}"
+
+    has_detail = "df" in session or "shots" in session
+    if has_detail:
+        rows, shots = session.get("df"), session.get("shots")
+        if not isinstance(rows, list) or not isinstance(shots, list):
+            _fail(where, "'df' and 'shots' must both be lists")
+        for i, row in enumerate(rows):
+            if not isinstance(row, dict):
+                _fail(f"{where} df row {i + 1}", "expected an object")
+            for col in COMPONENTS:
+                if row.get(col) not in (0, 1):
+                    _fail(f"{where} df row {i + 1}", f"'{col}' must be 0 or 1, got {row.get(col)!r}")
+        raw_3d = bool(shots) and isinstance(shots[0], dict) and "trajectory" in shots[0]
+        for i, shot in enumerate(shots):
+            if not isinstance(shot, dict):
+                _fail(f"{where} shot {i + 1}", "expected an object")
+            if shot.get("result") not in RESULTS:
+                _fail(f"{where} shot {i + 1}", f"'result' must be one of {RESULTS}, got {shot.get('result')!r}")
+            # Either raw 3D trajectories (projected on load) or pre-projected views, not a mix
+            if raw_3d != ("trajectory" in shot):
+                _fail(f"{where} shot {i + 1}", "all shots must have a 'trajectory' or none of them")
+            if raw_3d:
+                _check_trajectory(shot, f"{where} shot {i + 1}")
+            else:
+                _check_points(shot, "top_x", "top_y", f"{where} shot {i + 1}")
+                _check_points(shot, "side_x", "side_y", f"{where} shot {i + 1}")
+
+    missing = [f for f in SUMMARY_FIELDS if f not in session]
+    if not has_detail and missing:
+        _fail(where, f"summary session is missing {missing}")
+    if "Component_Averages" in session:
+        averages = session["Component_Averages"]
+        if not isinstance(averages, dict):
+            _fail(where, "'Component_Averages' must be an object")
+        for col in COMPONENTS[:3]:
+            if col not in averages:
+                _fail(where, f"'Component_Averages' is missing '{col}'")
+            _check_number(averages[col], f"{where}.Component_Averages.{col}")
+    for field in SUMMARY_FIELDS[1:]:
+        if field in session:
+            _check_number(session[field], f"{where}.{field}", integer=field != "Game_Make_Avg")
+    for field in ZONE_FIELDS:
+        if field in session:
+            counts = session[field]
+            if not isinstance(counts, list) or len(counts) != len(ZONES):
+                _fail(where, f"'{field}' must be a list of {len(ZONES)} counts")
+            for j, value in enumerate(counts):
+                _check_number(value, f"{where}.{field}[{j}]", integer=True)
+
+def validate_sessions(sessions):
+    """Validate a list of raw sessions, as stored in the legacy JSON files."""
+    if not isinstance(sessions, list):
+        raise SessionFormatError("session file: expected a list of sessions")
+    for i, session in enumerate(sessions):
+        validate_session(session, where=f"session at index {i}")
+
+# -----------------------------
+# Encoding
+# -----------------------------
+def _pack_points(shots, x_key, y_key):
+    """Concatenate per-shot point lists into one (2, P) array plus offsets."""
+    lengths = [len(s[x_key]) for s in shots]
+    offsets = np.zeros(len(shots) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    points = np.empty((2, offsets[-1]), dtype=np.float64)
+    points[0] = [v for s in shots for v in s[x_key]]
+    points[1] = [v for s in shots for v in s[y_key]]
+    return points, offsets
+
+def summarize_flags(flags):
+    """
+    Summary fields (as kept for the oldest sessions) computed from a session's
+    flags. Shots that failed the ingest checks are only counted in Flagged_Shots.
+    """
+    valid = valid_shots(flags)
+    makes = count(valid, GAME_MAKE)
+    return {
+        "Component_Averages": component_averages(valid),
+        "Game_Make_Avg": game_make_average(valid),
+        "Total_Shots": len(valid),
+        "Makes": makes,
+        "Misses": len(valid) - makes,
+        "Flagged_Shots": len(flags) - len(valid),
+    }
+
+def _side_heights(side, side_offsets, top_offsets):
+    """Heights aligned with the top-view points (None if the views are sampled differently)."""
+    return side[1] if np.array_equal(side_offsets, top_offsets) else None
+
+def encode_sessions(sessions):
+    """Turn validated raw sessions into a flat dict of arrays for np.savez."""
+    arrays = {"format_version": np.array(FORMAT_VERSION)}
+    meta = []
+    for i, session in enumerate(sessions):
+        entry = {k: v for k, v in session.items() if k not in ("df", "shots")}
+        entry["detail"] = "df" in session
+        meta.append(entry)
+        if not entry["detail"]:
+            continue
+        rows, shots = session["df"], session["shots"]
+        # df rows pair with shots by position; rows past the last shot are dropped and
+        # shots past the last row get no components (and are flagged below)
+        rows = rows[:len(shots)]
+        components = [[row[col] for col in COMPONENTS] for row in rows]
+        components += [[0] * len(COMPONENTS)] * (len(shots) - len(rows))
+        flags = pack_flags(components, [s["result"] == "Make" for s in shots])
+        if shots and "trajectory" in shots[0]:
+            # Raw 3D points only; both views are derived from them (see projection.py)
+            xyz, offsets = pack_trajectories([s["trajectory"] for s in shots])
+            arrays[f"s{i}_xyz"], arrays[f"s{i}_xyz_offsets"] = xyz, offsets
+            top, top_offsets, z = xyz[:2], offsets, xyz[2]
+        else:
+            top, top_offsets = _pack_points(shots, "top_x", "top_y")
+            side, side_offsets = _pack_points(shots, "side_x", "side_y")
+            arrays[f"s{i}_top"], arrays[f"s{i}_top_offsets"] = top, top_offsets
+            arrays[f"s{i}_side"], arrays[f"s{i}_side_offsets"] = side, side_offsets
+            z = _side_heights(side, side_offsets, top_offsets)
+        # Flag contradictory or implausible shots so they stay out of the aggregates below
+        arrays[f"s{i}_flags"] = check_shots(flags, top[0], top[1], z, top_offsets)
+        arrays[f"s{i}_flags"][len(rows):] |= np.uint8(INCONSISTENT)
+        attempts, makes = zone_counts(shot_zones(top, top_offsets), arrays[f"s{i}_flags"])
+        entry["Zone_Attempts"], entry["Zone_Makes"] = attempts.tolist(), makes.tolist()
+        entry.update(summarize_flags(arrays[f"s{i}_flags"]))
+    arrays["meta"] = np.array(json.dumps(meta))
+    return arrays
+
+# -----------------------------
+# Decoding
+# -----------------------------
+def _require(arrays, key, where):
+    if key not in arrays:
+        _fail(where, f"missing array '{key}'")
+    return arrays[key]
+
+def _check_offsets(offsets, n_shots, n_points, where):
+    if offsets.shape != (n_shots + 1,) or offsets[0] != 0 or offsets[-1] != n_points \
+            or np.any(np.diff(offsets) < 0):
+        _fail(where, "trajectory offsets do not match the stored points")
+
+def _migrate_v1(arrays):
+    """Version 1 stored an int8 component matrix and a bool result array per session."""
+    arrays = dict(arrays)
+    for key in [k for k in arrays if k.endswith("_components")]:
+        prefix = key[:-len("_components")]
+        arrays[f"{prefix}_flags"] = pack_flags(arrays.pop(key), arrays.pop(f"{prefix}_result"))
+    return arrays
+
+def decode_sessions(arrays):
+    """
+    Rebuild sessions from the arrays of a binary session file.
+    Trajectories are returned as NumPy views into the stored arrays (sessions
+    stored as raw 3D points also get "trajectories", and their top/side views
+    are projected on first access, see projection.py) and shot
+    outcomes as a uint8 bitfield under "flags" (see shot_flags.py).
+    "zones" holds each shot's court zone and "Zone_Attempts"/"Zone_Makes"
+    the per-zone totals (see court_zones.py).
+    """
+    version = int(_require(arrays, "format_version", "session file"))
+    if version == 1:
+        arrays = _migrate_v1(arrays)
+    elif version not in (2, 3, FORMAT_VERSION):  # v3 only added the optional xyz layout
+        raise SessionFormatError(
+            f"session file: unsupported format version {version} (expected {FORMAT_VERSION})"
+        )
+    meta = json.loads(str(_require(arrays, "meta", "session file")))
+
+    sessions = []
+    for i, entry in enumerate(meta):
+        session = {k: v for k, v in entry.items() if k != "detail"}
+        if entry["detail"]:
+            where = f"session {entry['session_number']}"
+            flags = _require(arrays, f"s{i}_flags", where)
+            n_shots = len(flags)
+            if flags.dtype != np.uint8 or flags.ndim != 1:
+                _fail(where, f"flags array must be 1-D uint8, got {flags.dtype} {flags.shape}")
+            results = [RESULTS[0] if f & RESULT_MAKE else RESULTS[1] for f in flags.tolist()]
+
+            if f"s{i}_xyz" in arrays:
+                xyz = _require(arrays, f"s{i}_xyz", where)
+                top_offsets = _require(arrays, f"s{i}_xyz_offsets", where)
+                if xyz.ndim != 2 or xyz.shape[0] != 3:
+                    _fail(where, f"xyz array has shape {xyz.shape}")
+                _check_offsets(top_offsets, n_shots, xyz.shape[1], where)
+                trajectories = ShotTrajectories(xyz, top_offsets)
+                top, z = trajectories.top, xyz[2]
+                session["trajectories"] = trajectories
+                session["shots"] = trajectories.shots(results)
+            else:
+                top = _require(arrays, f"s{i}_top", where)
+                top_offsets = _require(arrays, f"s{i}_top_offsets", where)
+                side = _require(arrays, f"s{i}_side", where)
+                side_offsets = _require(arrays, f"s{i}_side_offsets", where)
+                _check_offsets(top_offsets, n_shots, top.shape[1], where)
+                _check_offsets(side_offsets, n_shots, side.shape[1], where)
+                z = _side_heights(side, side_offsets, top_offsets)
+                session["shots"] = [{
+                    "top_x": top[0, top_offsets[k]:top_offsets[k + 1]],
+                    "top_y": top[1, top_offsets[k]:top_offsets[k + 1]],
+                    "side_x": side[0, side_offsets[k]:side_offsets[k + 1]],
+                    "side_y": side[1, side_offsets[k]:side_offsets[k + 1]],
+                    "result": results[k],
+                } for k in range(n_shots)]
+
+            if version < 4:
+                # Written before the ingest checks: run them now and redo the aggregates
+                flags = check_shots(flags, top[0], top[1], z, top_offsets)
+                session.update(summarize_flags(flags))
+                session.pop("Zone_Attempts", None)
+            session["flags"] = flags
+            session["zones"] = shot_zones(top, top_offsets)
+            if "Zone_Attempts" not in session:
+                attempts, makes = zone_counts(session["zones"], flags)
+                session["Zone_Attempts"], session["Zone_Makes"] = attempts.tolist(), makes.tolist()
+        sessions.append(session)
+    return sessions
+
+# -----------------------------
+# File I/O
+# -----------------------------
+NEW_FILE_MODE = 0o644  # permissions of files atomic_write creates
+
+@contextlib.contextmanager
+def atomic_write(path, mode="wb"):
+    """
+    Open a uniquely named temp file next to `path` and move it into place once
+    written, so readers never see a partial file and concurrent writers (tabs
+    are threads of one process) never share a temp file.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f"{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        # mkstemp creates the file private (0600); keep the mode of the file it replaces
+        try:
+            file_mode = os.stat(path).st_mode & 0o777
+        except FileNotFoundError:
+            file_mode = NEW_FILE_MODE
+        os.chmod(tmp_path, file_mode)
+        with os.fdopen(fd, mode) as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp_path)
+        raise
+
+def append_file(path, data, record_size=1, end=None):
+    """
+    Append bytes to a log file, first dropping a tail torn by a crash
+    mid-append: everything past `end` (the bytes known to be whole) if
+    given, else a partial record of `record_size` bytes. Callers serialize
+    appends to a file (the user's lock).
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "ab") as f:
+        size = f.seek(0, os.SEEK_END)
+        whole = min(size, end) if end is not None else size - size % record_size
+        if whole < size:
+            f.truncate(whole)
+        f.write(data)
+
+def write_session_file(path, sessions):
+    """
+    Validate and write raw sessions to `path` in the binary format (atomic replace).
+    Returns the metadata stored for each session, including its summary.
+    """
+    validate_sessions(sessions)
+    arrays = encode_sessions(sessions)
+    with atomic_write(path) as f:
+        np.savez(f, **arrays)
+    return json.loads(str(arrays["meta"]))
+
+def read_session_arrays(path, keys=None):
+    """Raw arrays of a binary session file (or archive chunk), optionally only `keys`."""
+    try:
+        with np.load(path, allow_pickle=False) as npz:
+            return {key: npz[key] for key in (npz.files if keys is None else keys)}
+    except (OSError, ValueError, KeyError) as e:
+        raise SessionFormatError(f"{path}: not a readable session file ({e})") from e
+
+def read_session_file(path):
+    """Read and validate a binary session file."""
+    return decode_sessions(read_session_arrays(path))
@@ -1,32 +1,74 @@
 # session_loader.py
-import json
-import pandas as pd
 import os
+import threading
+from collections import OrderedDict
+from storage import (
+    load_manifest, load_session, user_path, index_sessions, SHOT_INDEX_FILE, LEGACY_SHOT_INDEX_FILE,
+)
+from shot_index import ShotIndex
+from session_cache import SESSION_CACHE
 
-def load_newest_3_sessions(username):
-    """Load the 3 newest sessions for a given user from JSON."""
-    filename = f"{username}_newest_3_session.json"
-    filepath = os.path.join(os.path.dirname(__file__), filename)
+SHOT_INDEX_CACHE_USERS = 32  # users whose shot index stays loaded in this process
 
-    # Read JSON file
-    with open(filepath, "r") as f:
-        data = json.load(f)
+_shot_indexes = OrderedDict()  # username -> (ShotIndex, lock)
+_shot_indexes_lock = threading.Lock()
 
-    # Sort sessions by datetime descending (newest first)
-    sorted_sessions = sorted(data, key=lambda s: s["datetime"], reverse=True)
+def session_cache_key(username, entry):
+    """Cache key for a manifest entry; the file's mtime also covers re-created accounts and compaction."""
+    try:
+        mtime = os.stat(user_path(username, entry["file"])).st_mtime_ns
+    except OSError:
+        mtime = None
+    return (username, entry["session_number"], entry["version"], mtime)
 
-    # Return up to 3 newest sessions
-    return sorted_sessions[:3]
+def load_newest_3_sessions(username, lease=None):
+    """
+    Load the 3 newest sessions (with shot detail) for a given user.
+    Sessions come from the shared SESSION_CACHE as read-only objects; pass the
+    tab's lease to keep them cached while the tab shows them.
+    """
+    manifest = load_manifest(username)
+
+    # Manifest is kept sorted by datetime descending (newest first)
+    entries = [e for e in manifest["sessions"] if e["file"]][:3]
+    if lease is None:
+        lease = SESSION_CACHE.lease()  # pins the sessions only while they load
+    keys = [session_cache_key(username, e) for e in entries]
+    # The content key also keys the session's derived data (see derived.py)
+    sessions = [lease.get(key, lambda e=e, key=key: dict(load_session(username, e), content_key=key))
+                for key, e in zip(keys, entries)]
+    lease.hold(keys)
+    return sessions
 
 def load_oldest_7_sessions(username):
-    """Load the 7 oldest sessions for a given user from JSON."""
-    filename = f"{username}_oldest_7_session.json"
-    filepath = os.path.join(os.path.dirname(__file__), filename)
+    """Load summaries of the 7 sessions that follow the 3 newest."""
+    manifest = load_manifest(username)
+    newest = {e["session_number"] for e in [e for e in manifest["sessions"] if e["file"]][:3]}
+
+    # Summaries live in the manifest, so no session files are opened here
+    return [dict(e) for e in manifest["sessions"] if e["session_number"] not in newest][:7]
 
-    # Read JSON file
-    with open(filepath, "r") as f:
-        data = json.load(f)
+def load_shot_index(username, sessions):
+    """
+    The user's shot-location index, indexing any of these sessions it is missing.
+    Indexes are kept per process and only read what was appended to the log
+    since the last rerun, so a rerun costs a stat and a short read.
+    """
+    with _shot_indexes_lock:
+        entry = _shot_indexes.pop(username, None) or (ShotIndex(), threading.Lock())
+        _shot_indexes[username] = entry
+        while len(_shot_indexes) > SHOT_INDEX_CACHE_USERS:
+            _shot_indexes.popitem(last=False)
+    index, lock = entry
 
-    # Sort sessions by datetime ascending (oldest first)
-    sorted_sessions = sorted(data, key=lambda s: s["datetime"], reverse=True)
-    return sorted_sessions
+    path = user_path(username, SHOT_INDEX_FILE)
+    with lock:
+        index.follow(path)
+        # Add oldest first so the index stays in ingest order
+        missing = [s for s in sorted(sessions, key=lambda s: s["datetime"])
+                   if "shots" in s and len(s["shots"])
+                   and index.sessions.get(s["session_number"], -1) < s.get("version", 0)]
+        if missing or os.path.exists(user_path(username, LEGACY_SHOT_INDEX_FILE)):
+            index_sessions(username, missing)
+            index.follow(path)
+    return index
@@ -0,0 +1,67 @@
+# Consistency and anomaly checks run on every shot at ingest
+# shot_checks.py
+
+import numpy as np
+from court_zones import COURT_WIDTH, COURT_LENGTH, RIM_X, RIM_Y, RIM_HEIGHT
+from shot_flags import NET, GAME_MAKE, RESULT_MAKE, INCONSISTENT, NO_RIM_PASS, IMPLAUSIBLE, ANOMALY_BITS
+
+RIM_TOLERANCE = 1.5     # ft from the rim center where a make must pass rim height
+MAX_BALL_HEIGHT = 35    # ft
+COURT_MARGIN = 5        # ft a tracked ball may stray beyond the court lines
+MAX_STEP = 10           # ft between consecutive trajectory samples
+
+def _any_per_shot(point_idx, point_shot, n_shots):
+    """True for shots owning at least one of the given point indices."""
+    return np.bincount(point_shot[point_idx], minlength=n_shots) > 0
+
+def check_shots(flags, x, y, z, offsets):
+    """
+    Set the ingest check bits (see shot_flags) for a whole session in one pass
+    over its packed arrays, and return the new flags:
+      INCONSISTENT  result and Game Make disagree, or a make that missed the net
+      NO_RIM_PASS   a reported make whose trajectory never crosses rim height
+                    within RIM_TOLERANCE of the rim
+      IMPLAUSIBLE   non-finite points, points far off the court or above
+                    MAX_BALL_HEIGHT, or jumps longer than MAX_STEP between samples
+    z may be None when only the top view is known; geometry checks then use x/y only.
+    """
+    flags = np.asarray(flags, dtype=np.uint8) & np.uint8(0xFF ^ ANOMALY_BITS)
+    n_shots = len(flags)
+    result_make = (flags & RESULT_MAKE) != 0
+    game_make = (flags & GAME_MAKE) != 0
+    inconsistent = (result_make != game_make) | (game_make & ((flags & NET) == 0))
+
+    lengths = np.diff(offsets)
+    point_shot = np.repeat(np.arange(n_shots), lengths)
+    coords = (x, y) if z is None else (x, y, z)
+    # Segments j -> j+1 inside a shot
+    seg = np.ones(max(len(x) - 1, 0), dtype=bool)
+    ends = offsets[1:] - 1
+    seg[ends[(ends >= 0) & (ends < len(seg))]] = False
+
+    bad_point = ~np.isfinite(np.stack(coords)).all(axis=0)
+    bad_point |= (np.abs(x - RIM_X) > COURT_WIDTH / 2 + COURT_MARGIN)
+    bad_point |= (y < -COURT_MARGIN) | (y > COURT_LENGTH + COURT_MARGIN)
+    if z is not None:
+        bad_point |= (z < 0) | (z > MAX_BALL_HEIGHT)
+    step = np.sqrt(sum(np.diff(c) ** 2 for c in coords))
+    implausible = _any_per_shot(np.flatnonzero(bad_point), point_shot, n_shots)
+    implausible |= _any_per_shot(np.flatnonzero(seg & (step > MAX_STEP)), point_shot, n_shots)
+
+    no_rim_pass = np.zeros(n_shots, dtype=bool)
+    if z is not None:
+        # Where each segment meets rim height, interpolated, and how far that is from the rim
+        dz = z - RIM_HEIGHT
+        j = np.flatnonzero(seg & (dz[:-1] * dz[1:] <= 0))
+        denom = dz[j] - dz[j + 1]
+        t = np.divide(dz[j], denom, out=np.zeros(len(j)), where=denom != 0)
+        px = x[j] + (x[j + 1] - x[j]) * t
+        py = y[j] + (y[j + 1] - y[j]) * t
+        near = np.hypot(px - RIM_X, py - RIM_Y) <= RIM_TOLERANCE
+        reaches = _any_per_shot(j[near], point_shot, n_shots)
+        no_rim_pass = (result_make | game_make) & (lengths >= 2) & ~reaches
+
+    flags |= inconsistent.astype(np.uint8) * np.uint8(INCONSISTENT)
+    flags |= no_rim_pass.astype(np.uint8) * np.uint8(NO_RIM_PASS)
+    flags |= implausible.astype(np.uint8) * np.uint8(IMPLAUSIBLE)
+    return flags
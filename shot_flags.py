@@ -0,0 +1,89 @@
+# Per-shot outcome flags packed into one uint8 per shot
+# shot_flags.py
+
+import numpy as np
+import pandas as pd
+
+# Bit layout (bit 0 = least significant)
+BACKBOARD = 1 << 0
+RIM = 1 << 1
+NET = 1 << 2
+GAME_MAKE = 1 << 3
+RESULT_MAKE = 1 << 4  # trajectory result ("Make"/"Miss") reported with the shot
+
+# Ingest checks (set by shot_checks.py); flagged shots are left out of every aggregate
+INCONSISTENT = 1 << 5  # outcome columns contradict the reported result (or are missing)
+NO_RIM_PASS = 1 << 6   # reported make whose trajectory never reaches the rim
+IMPLAUSIBLE = 1 << 7   # physically implausible trajectory
+CHECK_BITS = {
+    "Outcome contradicts result": INCONSISTENT,
+    "Make never reaches the rim": NO_RIM_PASS,
+    "Implausible trajectory": IMPLAUSIBLE,
+}
+ANOMALY_BITS = INCONSISTENT | NO_RIM_PASS | IMPLAUSIBLE
+
+COMPONENT_BITS = {"Backboard": BACKBOARD, "Rim": RIM, "Net": NET, "Game Make": GAME_MAKE}
+TECHNICAL_COMPONENTS = ["Backboard", "Rim", "Net"]
+
+# Number of set bits for every possible byte value
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+def pack_flags(components, result_make):
+    """
+    Pack an (n, 4) 0/1 array of Backboard/Rim/Net/Game Make outcomes and an
+    (n,) boolean result array into one uint8 per shot.
+    """
+    components = np.asarray(components, dtype=np.uint8).reshape(-1, len(COMPONENT_BITS))
+    weights = np.array(list(COMPONENT_BITS.values()), dtype=np.uint8)
+    flags = (components * weights).sum(axis=1, dtype=np.uint8)
+    flags |= np.asarray(result_make, dtype=bool).astype(np.uint8) * np.uint8(RESULT_MAKE)
+    return flags
+
+def popcount(flags, mask=0xFF):
+    """Number of set bits in `flags & mask`, per shot."""
+    return _POPCOUNT[np.asarray(flags, dtype=np.uint8) & np.uint8(mask)]
+
+def count(flags, bit):
+    """Number of shots with `bit` set."""
+    return int(popcount(flags, bit).sum(dtype=np.int64))
+
+def shots_with(flags, bit, value=True):
+    """Indices of shots whose `bit` is set (or clear when value=False)."""
+    hit = (np.asarray(flags, dtype=np.uint8) & np.uint8(bit)) != 0
+    return np.flatnonzero(hit if value else ~hit)
+
+def valid_shots(flags):
+    """Flags of the shots that passed the ingest checks (what aggregates are computed over)."""
+    flags = np.asarray(flags, dtype=np.uint8)
+    return flags[(flags & np.uint8(ANOMALY_BITS)) == 0]
+
+def component_counts(flags):
+    """Count of valid shots with each component set, in COMPONENT_BITS order."""
+    flags = valid_shots(flags)
+    bits = np.unpackbits(flags[:, None], axis=1, bitorder="little")[:, :len(COMPONENT_BITS)]
+    return bits.sum(axis=0, dtype=np.int64)
+
+def component_averages(flags):
+    """Average of each technical component (Backboard, Rim, Net) over the valid shots."""
+    n = len(valid_shots(flags))
+    counts = component_counts(flags)
+    return {col: (float(counts[i] / n) if n else float("nan"))
+            for i, col in enumerate(COMPONENT_BITS) if col in TECHNICAL_COMPONENTS}
+
+def game_make_average(flags):
+    """Fraction of valid shots that scored in a real game."""
+    flags = valid_shots(flags)
+    return count(flags, GAME_MAKE) / len(flags) if len(flags) else float("nan")
+
+def flags_to_frame(flags):
+    """
+    Shot results table (one 0/1 column per component) for display and export,
+    plus a "Data Check" column naming failed ingest checks when any shot has one.
+    """
+    flags = np.asarray(flags, dtype=np.uint8)
+    df = pd.DataFrame({col: ((flags & np.uint8(bit)) != 0).astype(np.uint8)
+                       for col, bit in COMPONENT_BITS.items()})
+    if (flags & np.uint8(ANOMALY_BITS)).any():
+        df["Data Check"] = ["; ".join(name for name, bit in CHECK_BITS.items() if f & bit)
+                            for f in flags.tolist()]
+    return df
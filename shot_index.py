@@ -0,0 +1,248 @@
+# Per-user spatial index over historical shot release points
+# shot_index.py
+#
+# On disk the index is an append-only log of fixed-size records (shot ID,
+# session version, release x/y), so storing a session only appends its own
+# records (see storage.save_sessions). A newer version of a session
+# supersedes the rows of the older one when the log is read, and readers
+# can follow the log from the last offset they read.
+
+import os
+import numpy as np
+from court_zones import ZONES, classify_zones
+from session_format import atomic_write, append_file
+
+CELL_SIZE = 2.0  # feet per grid cell
+SHOT_ID_BITS = 20  # low bits hold the shot index within its session
+RECORD = np.dtype([("id", "<i8"), ("version", "<i8"), ("x", "<f8"), ("y", "<f8")])
+
+# -----------------------------
+# Shot IDs
+# -----------------------------
+def make_shot_ids(session_number, shot_idx):
+    """Global shot IDs from a session number and per-session shot indices."""
+    return (np.int64(session_number) << SHOT_ID_BITS) | np.asarray(shot_idx, dtype=np.int64)
+
+def split_shot_ids(shot_ids):
+    """Inverse of make_shot_ids: (session_numbers, shot_idx) arrays."""
+    shot_ids = np.asarray(shot_ids, dtype=np.int64)
+    return shot_ids >> SHOT_ID_BITS, shot_ids & ((1 << SHOT_ID_BITS) - 1)
+
+def shot_idx_in_session(shot_ids, session_number):
+    """Per-session shot indices (usable as plot/selection indices) for one session."""
+    sessions, idx = split_shot_ids(shot_ids)
+    return idx[sessions == session_number].tolist()
+
+# -----------------------------
+# Records
+# -----------------------------
+def shot_release_points(shots):
+    """
+    Top-view release point of every shot (NaN if it has no points), for raw or
+    loaded shot records (see court_zones.release_points for packed arrays).
+    """
+    x = np.full(len(shots), np.nan)
+    y = np.full(len(shots), np.nan)
+    for i, shot in enumerate(shots):
+        if "trajectory" in shot:
+            xs, ys = shot["trajectory"]["x"], shot["trajectory"]["y"]
+        else:
+            xs, ys = shot["top_x"], shot["top_y"]
+        if len(xs):
+            x[i], y[i] = xs[0], ys[0]
+    return x, y
+
+def session_records(session_number, version, x, y):
+    """Index records for one version of a session from its release point arrays."""
+    records = np.empty(len(x), dtype=RECORD)
+    records["id"] = make_shot_ids(session_number, np.arange(len(x)))
+    records["version"] = version
+    records["x"], records["y"] = x, y
+    return records
+
+def append_records(path, records):
+    """Append records to an index log. Callers hold the user's lock."""
+    append_file(path, np.ascontiguousarray(records, dtype=RECORD).tobytes(), RECORD.itemsize)
+
+def legacy_records(path):
+    """Records (as version 0) from an index saved before the log format (shot_index.npz)."""
+    with np.load(path, allow_pickle=False) as npz:
+        records = np.empty(len(npz["ids"]), dtype=RECORD)
+        records["id"], records["x"], records["y"] = npz["ids"], npz["x"], npz["y"]
+    records["version"] = 0
+    return records
+
+# -----------------------------
+# Index
+# -----------------------------
+class ShotIndex:
+    """
+    Uniform grid over top-view release points. Rows are kept in ingest order,
+    so "last N" queries are a tail slice of the matching rows. Rows of
+    superseded session versions stay in place but no longer match queries.
+    """
+
+    def __init__(self):
+        self.ids = np.empty(0, dtype=np.int64)
+        self.versions = np.empty(0, dtype=np.int64)
+        self.x = np.empty(0, dtype=np.float64)
+        self.y = np.empty(0, dtype=np.float64)
+        self.zones = np.empty(0, dtype=np.int8)
+        self.current = np.empty(0, dtype=bool)  # row belongs to the indexed version of its session
+        self.sessions = {}  # session number -> indexed version
+        self.offset = 0     # bytes of the log read so far (see follow)
+        self._file = None
+        self._cells = {}
+
+    def __len__(self):
+        return int(self.current.sum())
+
+    def _add_to_cells(self, rows, x, y):
+        # Group the new rows by cell, then append one chunk per touched cell
+        cx = np.floor(x / CELL_SIZE).astype(np.int64)
+        cy = np.floor(y / CELL_SIZE).astype(np.int64)
+        # One sortable key per cell (cy fits in 32 bits on any court)
+        order = np.argsort((cx << 32) + (cy + (1 << 31)), kind="stable")
+        cx, cy = cx[order], cy[order]
+        starts = np.flatnonzero(np.r_[True, (cx[1:] != cx[:-1]) | (cy[1:] != cy[:-1])])
+        for kx, ky, chunk in zip(cx[starts].tolist(), cy[starts].tolist(), np.split(rows[order], starts[1:])):
+            self._cells.setdefault((kx, ky), []).append(chunk)
+
+    def add_session(self, session):
+        """Index a loaded session's shots. Returns False if this version was already indexed."""
+        if "shots" not in session:
+            return False
+        x, y = shot_release_points(session["shots"])
+        return self.add_release_points(session["session_number"], x, y, session.get("version", 0))
+
+    def add_release_points(self, session_number, x, y, version=0):
+        """Index a session version from its release point arrays (NaN for unknown)."""
+        return self.add_records(session_records(session_number, version,
+                                                np.asarray(x, dtype=np.float64),
+                                                np.asarray(y, dtype=np.float64)))
+
+    def add_records(self, records):
+        """
+        Index records in order. Only the newest version of each session is
+        kept: older rows it supersedes stop matching, and versions that are
+        already indexed (or older) are skipped. Returns True if anything changed.
+        """
+        if not len(records):
+            return False
+        numbers, versions = split_shot_ids(records["id"])[0], records["version"]
+        # Records come in blocks, one per appended session version
+        starts = np.flatnonzero(np.r_[True, (numbers[1:] != numbers[:-1]) | (versions[1:] != versions[:-1])])
+        blocks = list(zip(numbers[starts].tolist(), versions[starts].tolist()))
+        newer = {}
+        for n, v in blocks:
+            if v > newer.get(n, self.sessions.get(n, -1)):
+                newer[n] = v
+        if not newer:
+            return False
+
+        replaced = [n for n in newer if n in self.sessions]
+        if replaced:
+            self.current[np.isin(split_shot_ids(self.ids)[0], replaced)] = False
+        # The first block of each newest version (two tabs may have appended it twice)
+        taken = set()
+        keep = []
+        for n, v in blocks:
+            keep.append(newer.get(n) == v and n not in taken)
+            if keep[-1]:
+                taken.add(n)
+        kept = records[np.repeat(keep, np.diff(np.r_[starts, len(records)]))]
+        self._append(kept["id"], kept["version"], kept["x"], kept["y"])
+        self.sessions.update(newer)
+        return True
+
+    def _append(self, ids, versions, x, y):
+        located = ~np.isnan(x) & ~np.isnan(y)
+        ids, versions, x, y = ids[located], versions[located], x[located], y[located]
+        rows = np.arange(len(self.ids), len(self.ids) + len(ids))
+        # Row arrays first, then the cells pointing at them
+        self.current = np.concatenate([self.current, np.ones(len(ids), dtype=bool)])
+        self.ids = np.concatenate([self.ids, ids])
+        self.versions = np.concatenate([self.versions, versions])
+        self.x = np.concatenate([self.x, x])
+        self.y = np.concatenate([self.y, y])
+        self.zones = np.concatenate([self.zones, classify_zones(x, y)])
+        self._add_to_cells(rows, x, y)
+
+    # -----------------------------
+    # Queries (all return shot IDs, oldest first)
+    # -----------------------------
+    def _rows_within(self, x, y, radius):
+        c0x, c1x = int(np.floor((x - radius) / CELL_SIZE)), int(np.floor((x + radius) / CELL_SIZE))
+        c0y, c1y = int(np.floor((y - radius) / CELL_SIZE)), int(np.floor((y + radius) / CELL_SIZE))
+        chunks = [chunk for cx in range(c0x, c1x + 1) for cy in range(c0y, c1y + 1)
+                  for chunk in self._cells.get((cx, cy), ())]
+        if not chunks:
+            return np.empty(0, dtype=np.int64)
+        rows = np.sort(np.concatenate(chunks))
+        rows = rows[self.current[rows]]
+        return rows[np.hypot(self.x[rows] - x, self.y[rows] - y) <= radius]
+
+    def within_radius(self, x, y, radius, last=None):
+        """Shots released within `radius` ft of (x, y)."""
+        rows = self._rows_within(x, y, radius)
+        return self.ids[rows[-last:] if last else rows]
+
+    def nearest(self, x, y, k=1):
+        """The k shots released closest to (x, y), nearest first."""
+        if not len(self):
+            return np.empty(0, dtype=np.int64)
+        # Grow the search radius until it holds k shots (or covers every shot)
+        reach = np.hypot(np.abs(self.x - x).max(), np.abs(self.y - y).max())
+        radius = CELL_SIZE
+        rows = self._rows_within(x, y, radius)
+        while len(rows) < k and radius < reach:
+            radius *= 2
+            rows = self._rows_within(x, y, radius)
+        order = np.argsort(np.hypot(self.x[rows] - x, self.y[rows] - y), kind="stable")
+        return self.ids[rows[order[:k]]]
+
+    def in_zone(self, zone, last=None):
+        """Shots released in a court zone (name or index into ZONES)."""
+        zone = ZONES.index(zone) if isinstance(zone, str) else zone
+        rows = np.flatnonzero((self.zones == zone) & self.current)
+        return self.ids[rows[-last:] if last else rows]
+
+    # -----------------------------
+    # Persistence
+    # -----------------------------
+    def follow(self, path):
+        """
+        Index whatever was appended to the log at `path` since the last call.
+        Starts over if the log was rewritten (see save). Returns the records read.
+        """
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            return 0
+        with f:
+            stat = os.fstat(f.fileno())
+            if (stat.st_dev, stat.st_ino) != self._file or stat.st_size < self.offset:
+                self.__init__()
+                self._file = (stat.st_dev, stat.st_ino)
+            f.seek(self.offset)
+            n = (stat.st_size - self.offset) // RECORD.itemsize  # whole records only
+            data = f.read(n * RECORD.itemsize)
+        n = len(data) // RECORD.itemsize
+        self.offset += n * RECORD.itemsize
+        self.add_records(np.frombuffer(data[:n * RECORD.itemsize], dtype=RECORD))
+        return n
+
+    def save(self, path):
+        """Write the current rows as a fresh log, dropping superseded ones. Callers hold the user's lock."""
+        rows = np.flatnonzero(self.current)
+        records = np.empty(len(rows), dtype=RECORD)
+        records["id"], records["version"] = self.ids[rows], self.versions[rows]
+        records["x"], records["y"] = self.x[rows], self.y[rows]
+        with atomic_write(path) as f:
+            f.write(records.tobytes())
+
+    @classmethod
+    def load(cls, path):
+        index = cls()
+        index.follow(path)
+        return index
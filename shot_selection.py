@@ -1,39 +1,61 @@
 # Shot Selection where user can select which shots to include in the analysis
 # shot_selection.py
 
+import numpy as np
 import streamlit as st
+from shot_flags import shots_with, RESULT_MAKE
+from shot_index import shot_idx_in_session
 
-def selected_shots_idx(shots):
+def selected_shots_idx(shots, flags, shot_index=None, session_number=None):
+    n_shots = len(shots)
     shot_labels = [f"Shot {i+1} ({s['result']})" for i, s in enumerate(shots)]
-    makes = [shot_labels[i] for i, s in enumerate(shots) if s['result'] == "Make"]
-    misses = [shot_labels[i] for i, s in enumerate(shots) if s['result'] == "Miss"]
 
+    # The tab keeps its selection as a packed bit mask (one bit per shot), not label strings
     if 'selected_shots' not in st.session_state:
-        st.session_state.selected_shots = shot_labels.copy()
+        selected = np.ones(n_shots, dtype=bool)
     else:
-        # Filter previous selections to only include valid labels
-        st.session_state.selected_shots = [
-            s for s in st.session_state.selected_shots if s in shot_labels
-        ]
+        # Carry the previous selection over to shots that still exist
+        selected = np.unpackbits(st.session_state.selected_shots, count=n_shots).astype(bool)
 
     col1, col2, col3, col4 = st.columns([1,1,1,1])
     with col1:
         if st.button("Select All Shots"):
-            st.session_state.selected_shots = shot_labels.copy()
+            selected[:] = True
     with col2:
         if st.button("Clear All Shots"):
-            st.session_state.selected_shots = []
+            selected[:] = False
     with col3:
         if st.button("Show All Makes"):
-            st.session_state.selected_shots = makes
+            selected[:] = False
+            selected[shots_with(flags, RESULT_MAKE)] = True
     with col4:
         if st.button("Show All Misses"):
-            st.session_state.selected_shots = misses
+            selected[:] = False
+            selected[shots_with(flags, RESULT_MAKE, value=False)] = True
 
-    st.session_state.selected_shots = st.multiselect(
+    if shot_index is not None:
+        with st.expander("Select shots near a spot on the court"):
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                spot_x = st.number_input("Court X (ft)", min_value=-25.0, max_value=25.0, value=0.0)
+            with col2:
+                spot_y = st.number_input("Court Y (ft)", min_value=0.0, max_value=47.0, value=22.0)
+            with col3:
+                radius = st.number_input("Radius (ft)", min_value=0.5, max_value=50.0, value=3.0)
+            if st.button("Select Shots Near Spot"):
+                shot_ids = shot_index.within_radius(spot_x, spot_y, radius)
+                idx = np.asarray(shot_idx_in_session(shot_ids, session_number), dtype=np.int64)
+                selected[:] = False
+                selected[idx[idx < n_shots]] = True
+
+    selected_idx = st.multiselect(
         "Choose which shots to display:",
-        options=shot_labels,
-        default=st.session_state.selected_shots
+        options=range(n_shots),
+        format_func=lambda i: shot_labels[i],
+        default=np.flatnonzero(selected).tolist()
     )
+    selected[:] = False
+    selected[selected_idx] = True
+    st.session_state.selected_shots = np.packbits(selected)
 
-    return [shot_labels.index(s) for s in st.session_state.selected_shots]
\ No newline at end of file
+    return selected_idx
@@ -0,0 +1,344 @@
+# Per-user storage layout under a configurable data root
+# storage.py
+#
+# <DATA_ROOT>/users/<h[0:2]>/<h[2:4]>/<h>/     h = sha256(username)
+#     account.json      login credentials
+#     manifest.json     sessions, their versions and summaries (snapshot)
+#     manifest.log      entries saved since the snapshot, one JSON object per line
+#     sessions/<n>.npz  one binary session file per session (see session_format.py)
+#     archive/<k>.npz   compressed trajectories of compacted sessions (see compaction.py)
+#     shot_index.bin    append-only log of shot release points (see shot_index.py)
+#     shot_ids.bin      shot_id keys of bulk-imported shots (see bulk_import.py)
+#     derived/<n>/      memoized artifacts of session n (see derived.py)
+
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+import numpy as np
+from session_format import (
+    write_session_file, read_session_file, atomic_write, append_file, read_session_arrays, decode_sessions,
+    validate_sessions, SessionFormatError, FORMAT_VERSION, SUMMARY_FIELDS, ZONE_FIELDS,
+)
+from shot_index import shot_release_points, session_records, append_records, legacy_records
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+DATA_ROOT = os.environ.get("HOOPIQ_DATA_ROOT", os.path.join(os.path.dirname(__file__), "data"))
+SHOT_INDEX_FILE = "shot_index.bin"
+LEGACY_SHOT_INDEX_FILE = "shot_index.npz"  # whole-index snapshot, before the append-only log
+MANIFEST_FILE = "manifest.json"
+MANIFEST_LOG = "manifest.log"
+MANIFEST_LOG_MIN = 1000      # log entries always allowed before the snapshot is rewritten
+MANIFEST_CACHE_USERS = 256   # users whose manifest stays parsed in this process
+
+# -----------------------------
+# Layout
+# -----------------------------
+def user_dir(username):
+    """Shard directory for a user, computed from the username (no directory scans)."""
+    h = hashlib.sha256(username.encode("utf-8")).hexdigest()
+    return os.path.join(DATA_ROOT, "users", h[:2], h[2:4], h)
+
+def user_path(username, *parts):
+    return os.path.join(user_dir(username), *parts)
+
+def write_json(path, data, indent=4):
+    """Write JSON atomically so concurrent readers never see a partial file."""
+    with atomic_write(path, "w") as f:
+        json.dump(data, f, indent=indent)
+
+def read_json(path):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def _lock_fd(fd):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        return
+    while True:
+        try:
+            msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+            return
+        except OSError:  # LK_LOCK gives up after ~10 s; keep waiting
+            pass
+
+def _unlock_fd(fd):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+@contextlib.contextmanager
+def user_lock(username):
+    """
+    Exclusive lock on a user's directory, shared by all threads and worker
+    processes. The OS releases it if the holder dies, so it is never broken
+    by a waiter, however long the holder takes. Not reentrant.
+    """
+    os.makedirs(user_dir(username), exist_ok=True)
+    # The lock file stays in place; each holder opens it (its own open file description)
+    fd = os.open(user_path(username, ".lock"), os.O_CREAT | os.O_RDWR, 0o666)
+    try:
+        _lock_fd(fd)
+        try:
+            yield
+        finally:
+            _unlock_fd(fd)
+    finally:
+        os.close(fd)
+
+def delete_user_data(username):
+    """Remove a user's whole shard directory."""
+    shutil.rmtree(user_dir(username), ignore_errors=True)
+
+# -----------------------------
+# Manifest
+# -----------------------------
+# Saving sessions appends their entries to manifest.log; the snapshot is
+# rewritten only once the log holds more entries than the snapshot (and at
+# least MANIFEST_LOG_MIN), so a save costs O(saved sessions) amortized.
+# Parsed manifests stay cached per process and readers only parse the log
+# lines appended since their last read.
+class _ManifestState:
+    """A user's manifest as last read: the snapshot plus the log entries applied on top."""
+
+    def __init__(self, snapshot, stamp):
+        self.header = {k: v for k, v in snapshot.items() if k != "sessions"}
+        self.entries = {e["session_number"]: e for e in snapshot["sessions"]}
+        self.snapshot_entries = len(self.entries)
+        self.stamp = stamp      # (inode, mtime, size) of the snapshot, None if there is none
+        self.log_offset = 0     # bytes of the log applied
+        self.log_entries = 0
+        self._sessions = None
+
+    def apply(self, entries):
+        for entry in entries:
+            self.entries[entry["session_number"]] = entry
+        self.log_entries += len(entries)
+        if entries:
+            self._sessions = None
+
+    def manifest(self):
+        """The manifest dict, sessions newest first (entries are shared; treat them as read-only)."""
+        if self._sessions is None:
+            self._sessions = sorted(self.entries.values(), key=lambda e: e["datetime"], reverse=True)
+        return dict(self.header, sessions=list(self._sessions))
+
+_manifests = OrderedDict()  # username -> _ManifestState
+_manifests_lock = threading.Lock()
+
+def _file_stamp(f):
+    stat = os.fstat(f.fileno())
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+def _read_snapshot(username):
+    try:
+        with open(user_path(username, MANIFEST_FILE), "r") as f:
+            return _ManifestState(json.load(f), _file_stamp(f))
+    except FileNotFoundError:
+        return _ManifestState(_empty_manifest(username), None)
+
+def _manifest_state(username):
+    """
+    The user's manifest state, brought up to date by reading only what changed
+    (None if the user has no manifest). The state is owned by the caller
+    until it is handed back to the cache.
+    """
+    with _manifests_lock:
+        state = _manifests.pop(username, None)
+    try:
+        with open(user_path(username, MANIFEST_FILE), "r") as f:
+            if state is None or state.stamp != _file_stamp(f):
+                state = _ManifestState(json.load(f), _file_stamp(f))
+    except FileNotFoundError:
+        if state is None or state.stamp is not None:
+            state = _ManifestState(_empty_manifest(username), None)
+    try:
+        with open(user_path(username, MANIFEST_LOG), "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < state.log_offset:
+                # The log was reset after a snapshot rewrite this read started before
+                state = _read_snapshot(username)
+            f.seek(state.log_offset)
+            data = f.read(size - state.log_offset)
+    except FileNotFoundError:
+        data = b""
+    if state.stamp is None and not data and not state.entries:
+        return None
+    # Leave a partially written last line for the next read
+    end = data.rfind(b"\n") + 1
+    state.apply([json.loads(line) for line in data[:end].splitlines() if line.strip()])
+    state.log_offset += end
+    with _manifests_lock:
+        _manifests[username] = state
+        while len(_manifests) > MANIFEST_CACHE_USERS:
+            _manifests.popitem(last=False)
+    return state
+
+def read_manifest(username):
+    """The user's manifest, or None if they have none yet."""
+    state = _manifest_state(username)
+    return None if state is None else state.manifest()
+
+def load_manifest(username):
+    """
+    The user's manifest, importing legacy session files on first access and
+    refreshing entries written by an older format (see migrate_manifest).
+    """
+    manifest = read_manifest(username)
+    if manifest is None:
+        manifest = import_legacy_sessions(username)
+    elif manifest.get("format_version", 0) < FORMAT_VERSION:
+        migrate_manifest(username)
+        manifest = read_manifest(username)
+    return manifest
+
+def migrate_manifest(username):
+    """
+    Recompute the summaries and zone counts of a manifest written before the
+    current format (files older than v4 predate the ingest checks, which
+    decoding now runs), then mark the manifest current. Runs once per user.
+    """
+    with user_lock(username):
+        manifest = read_manifest(username)
+        if manifest is None or manifest.get("format_version", 0) >= FORMAT_VERSION:
+            return
+        sessions = []
+        for entry in manifest["sessions"]:
+            if entry.get("file"):
+                session = load_session(username, entry)
+                entry = dict(entry, **{f: session[f] for f in SUMMARY_FIELDS + ["Flagged_Shots"] + ZONE_FIELDS})
+            sessions.append(entry)
+        write_manifest(username, dict(manifest, format_version=FORMAT_VERSION, sessions=sessions))
+
+def write_manifest(username, manifest):
+    """Rewrite the snapshot from a whole manifest and start an empty log. Callers hold the user's lock."""
+    write_json(user_path(username, MANIFEST_FILE), manifest, indent=None)
+    with open(user_path(username, MANIFEST_LOG), "w"):
+        pass
+
+def append_manifest_entries(username, entries):
+    """Add or replace manifest entries by appending them to the log. Callers hold the user's lock."""
+    state = _manifest_state(username) or _ManifestState(_empty_manifest(username), None)
+    # Everything before log_offset was read as whole lines
+    append_file(user_path(username, MANIFEST_LOG),
+                "".join(json.dumps(entry) + "\n" for entry in entries).encode("utf-8"), end=state.log_offset)
+    state = _manifest_state(username)  # with the appended lines
+    if state.stamp is None or state.log_entries > max(MANIFEST_LOG_MIN, state.snapshot_entries):
+        write_manifest(username, state.manifest())
+
+def _empty_manifest(username):
+    return {"username": username, "format_version": FORMAT_VERSION, "sessions": []}
+
+def save_sessions(username, sessions):
+    """
+    Validate and store raw sessions for a user. Sessions with a detail section
+    get their own file; a session number that already exists is replaced and
+    its version bumped, and the shot index learns the new release points.
+    Returns the stored manifest entries.
+    """
+    validate_sessions(sessions)
+    with user_lock(username):
+        state = _manifest_state(username) or _ManifestState(_empty_manifest(username), None)
+        saved, indexed = {}, []
+        for session in sessions:
+            number = session["session_number"]
+            if "df" in session:
+                # The stored metadata carries the summary and zone counts
+                file = os.path.join("sessions", f"{number}.npz")
+                entry = write_session_file(user_path(username, file), [session])[0]
+                entry["file"] = file
+            else:
+                entry = dict(session, file=None)
+            entry.pop("detail", None)
+            previous = saved.get(number) or state.entries.get(number)
+            if previous is not None:
+                # Stale artifacts would be recomputed anyway; drop them with the old version
+                shutil.rmtree(user_path(username, "derived", str(number)), ignore_errors=True)
+            entry["version"] = previous["version"] + 1 if previous is not None else 1
+            saved[number] = entry
+            if "shots" in session:
+                indexed.append(dict(session, version=entry["version"]))
+        append_manifest_entries(username, list(saved.values()))
+        _index_sessions(username, indexed)
+    return list(saved.values())
+
+# -----------------------------
+# Shot index
+# -----------------------------
+def _index_sessions(username, sessions):
+    """Append the release points of sessions (raw or loaded, with their version). Lock held."""
+    path = user_path(username, SHOT_INDEX_FILE)
+    legacy = user_path(username, LEGACY_SHOT_INDEX_FILE)
+    if os.path.exists(legacy):
+        # Carry an index from before the log format over, once
+        if not os.path.exists(path):
+            append_records(path, legacy_records(legacy))
+        os.remove(legacy)
+    records = [session_records(s["session_number"], s["version"], *shot_release_points(s["shots"]))
+               for s in sessions]
+    if records:
+        append_records(path, np.concatenate(records))
+
+def index_sessions(username, sessions=()):
+    """
+    Add loaded sessions to the user's shot index (e.g. ones stored before the
+    index was kept up to date on save), migrating a legacy index first.
+    """
+    with user_lock(username):
+        _index_sessions(username, sessions)
+
+def load_session(username, entry):
+    """
+    Full session for a manifest entry (the entry itself if it is summary-only).
+    Trajectories of compacted sessions are re-hydrated from their archive chunk.
+    """
+    if not entry.get("file"):
+        return dict(entry)
+    if entry.get("archive"):
+        arrays = read_session_arrays(user_path(username, entry["file"]))
+        prefix = f"n{entry['session_number']}_"
+        archived = read_session_arrays(user_path(username, entry["archive"]),
+                                       [prefix + name for name in entry["archived_arrays"]])
+        arrays.update({f"s0_{key[len(prefix):]}": value for key, value in archived.items()})
+        session = decode_sessions(arrays)[0]
+    else:
+        session = read_session_file(user_path(username, entry["file"]))[0]
+    session["version"] = entry["version"]
+    return session
+
+# -----------------------------
+# Legacy layout
+# -----------------------------
+LEGACY_DIR = os.path.dirname(__file__)
+LEGACY_SESSION_FILES = ["{username}_newest_3_session.json", "{username}_oldest_7_session.json"]
+
+def import_legacy_sessions(username):
+    """
+    Copy a user's sessions from the old flat files next to the code into
+    their shard directory. Returns the resulting manifest.
+    """
+    sessions = []
+    for pattern in LEGACY_SESSION_FILES:
+        path = os.path.join(LEGACY_DIR, pattern.format(username=username))
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                try:
+                    sessions.extend(json.load(f))
+                except json.JSONDecodeError as e:
+                    raise SessionFormatError(f"{path}: invalid JSON ({e})") from e
+    if not sessions:
+        return _empty_manifest(username)
+    save_sessions(username, sessions)
+    return read_manifest(username)